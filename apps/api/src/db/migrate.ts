@@ -6,7 +6,7 @@
 
 import { Effect, Console } from "effect"
 import { SqlClient } from "@effect/sql"
-import { PgClientLive } from "./config"
+import { PgClientLive } from "./config.js"
 
 const createTables = `
 -- Signal history table
@@ -62,6 +62,7 @@ CREATE TABLE IF NOT EXISTS speedtest_results (
 );
 
 CREATE INDEX IF NOT EXISTS idx_speedtest_timestamp ON speedtest_results(timestamp_unix DESC);
+CREATE INDEX IF NOT EXISTS idx_speedtest_status_timestamp ON speedtest_results(status, timestamp_unix DESC);
 
 -- Disruption events table
 CREATE TABLE IF NOT EXISTS disruption_events (
@@ -85,7 +86,6 @@ CREATE INDEX IF NOT EXISTS idx_disruption_severity ON disruption_events(severity
 -- Network quality results table
 CREATE TABLE IF NOT EXISTS network_quality_results (
   id SERIAL PRIMARY KEY,
-  timestamp TEXT NOT NULL,
   timestamp_unix DOUBLE PRECISION NOT NULL,
   target_host TEXT NOT NULL,
   target_name TEXT,
@@ -96,6 +96,21 @@ CREATE TABLE IF NOT EXISTS network_quality_results (
   error_message TEXT
 );
 
+-- Rows are timed by timestamp_unix alone. Tables from older installs still
+-- have an ISO timestamp column; it is kept with its data, but new rows no
+-- longer fill it, so it must accept NULL.
+DO $$
+BEGIN
+  IF EXISTS (
+    SELECT 1 FROM information_schema.columns
+    WHERE table_schema = current_schema()
+      AND table_name = 'network_quality_results'
+      AND column_name = 'timestamp'
+  ) THEN
+    ALTER TABLE network_quality_results ALTER COLUMN timestamp DROP NOT NULL;
+  END IF;
+END $$;
+
 CREATE INDEX IF NOT EXISTS idx_nq_timestamp ON network_quality_results(timestamp_unix DESC);
 `
 
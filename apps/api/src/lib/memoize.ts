@@ -0,0 +1,18 @@
+/**
+ * Memoize a value derived from an object, keyed by object identity.
+ *
+ * Meant for objects that are replaced rather than mutated when they change
+ * (service configs, state maps held in a Ref): the value is built once per
+ * object and dropped along with it.
+ */
+export const memoizeByRef = <K extends object, V>(build: (key: K) => V): ((key: K) => V) => {
+  const cache = new WeakMap<K, V>()
+  return (key) => {
+    let value = cache.get(key)
+    if (value === undefined) {
+      value = build(key)
+      cache.set(key, value)
+    }
+    return value
+  }
+}
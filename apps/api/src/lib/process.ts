@@ -0,0 +1,135 @@
+/**
+ * Child process runner shared by the speedtest and network quality services
+ */
+
+import { Effect } from "effect"
+import * as ChildProcess from "node:child_process"
+
+// ============================================
+// Types
+// ============================================
+
+export interface CommandOutput {
+  readonly stdout: string
+  readonly stderr: string
+  readonly code: number
+}
+
+export class CommandError {
+  readonly _tag = "CommandError"
+  constructor(
+    readonly type: "execution" | "timeout",
+    readonly message: string,
+    readonly cause?: unknown
+  ) {}
+}
+
+export interface RunCommandOptions {
+  /** Run through the platform shell (needed for .cmd shims such as bunx on Windows) */
+  readonly shell?: boolean
+}
+
+// ============================================
+// Constants
+// ============================================
+
+/**
+ * stderr is only ever surfaced as an error message, so only its tail is
+ * kept; progress or log chatter on long runs can't grow the buffer
+ */
+const STDERR_TAIL_BYTES = 8 * 1024
+
+// ============================================
+// Helper Functions
+// ============================================
+
+/**
+ * Decode the last STDERR_TAIL_BYTES of stderr. The cut point is moved past
+ * any UTF-8 continuation bytes (0b10xxxxxx) so a multi-byte character
+ * isn't split into a replacement character at the start.
+ */
+const decodeStderrTail = (chunks: readonly Buffer[]): string => {
+  const buffer = Buffer.concat(chunks)
+  let start = Math.max(0, buffer.length - STDERR_TAIL_BYTES)
+  while (start > 0 && start < buffer.length && (buffer[start] & 0xc0) === 0x80) start++
+  return buffer.subarray(start).toString("utf8")
+}
+
+/**
+ * Run a command and return stdout/stderr. The child is killed on timeout
+ * and when the effect is interrupted.
+ */
+export const runCommand = (
+  cmd: readonly string[],
+  timeout: number,
+  options: RunCommandOptions = {}
+): Effect.Effect<CommandOutput, CommandError> =>
+  Effect.async<CommandOutput, CommandError>((resume) => {
+    const [executable, ...args] = cmd
+
+    // No caller reads stdin; leaving it unpiped saves a pipe per run
+    const proc = ChildProcess.spawn(executable, args, {
+      shell: options.shell ?? false,
+      windowsHide: true,
+      stdio: ["ignore", "pipe", "pipe"],
+    })
+
+    // Raw chunks are kept and decoded once on close, so multi-byte
+    // characters split across chunks survive and no per-chunk strings
+    // are built for large outputs
+    const stdoutChunks: Buffer[] = []
+    const stderrChunks: Buffer[] = []
+    let stderrBytes = 0
+    let resolved = false
+
+    // Manual timeout handling, so the timeout surfaces as its own error type
+    const timeoutId = setTimeout(() => {
+      if (!resolved) {
+        resolved = true
+        proc.kill("SIGTERM")
+        resume(Effect.fail(new CommandError("timeout", `Command timed out after ${timeout}s`)))
+      }
+    }, timeout * 1000)
+
+    proc.stdout?.on("data", (data: Buffer) => {
+      stdoutChunks.push(data)
+    })
+
+    proc.stderr?.on("data", (data: Buffer) => {
+      stderrChunks.push(data)
+      stderrBytes += data.length
+      // Drop whole leading chunks that fall outside the kept tail
+      while (stderrChunks.length > 1 && stderrBytes - stderrChunks[0].length >= STDERR_TAIL_BYTES) {
+        stderrBytes -= stderrChunks.shift()!.length
+      }
+    })
+
+    proc.on("close", (code) => {
+      if (!resolved) {
+        resolved = true
+        clearTimeout(timeoutId)
+        resume(
+          Effect.succeed({
+            stdout: Buffer.concat(stdoutChunks).toString("utf8"),
+            stderr: decodeStderrTail(stderrChunks),
+            code: code ?? 1,
+          })
+        )
+      }
+    })
+
+    proc.on("error", (err: Error) => {
+      if (!resolved) {
+        resolved = true
+        clearTimeout(timeoutId)
+        resume(Effect.fail(new CommandError("execution", err.message, err)))
+      }
+    })
+
+    // Interrupted (e.g. a test cancelled mid-run): don't leave the child running
+    return Effect.sync(() => {
+      resolved = true
+      clearTimeout(timeoutId)
+      proc.kill()
+    })
+  })
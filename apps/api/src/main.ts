@@ -43,7 +43,7 @@ import {
   HttpServerResponse,
 } from "@effect/platform"
 import { BunHttpServer, BunRuntime } from "@effect/platform-bun"
-import { Effect, Layer, pipe, Schedule } from "effect"
+import { Effect, Fiber, Layer, pipe, Schedule } from "effect"
 
 import {
   HealthRoutes,
@@ -71,17 +71,15 @@ import { NetworkQualityService, NetworkQualityServiceLive } from "./services/Net
 // Server configuration
 const PORT = Number(process.env.PORT ?? 3001)
 
-// Database layer - provides SqlClient to all services that need it
+// Database layer - provides SqlClient to all services that need it.
+// Layers are memoized by reference, so every service shares this one pool.
 const DbLayer = PgClientLive
 
 // Repository layer - uses SqlClient
 const RepositoryLayer = Layer.provide(SignalRepositoryLive, DbLayer)
 
-// Network Quality layer - uses SqlClient directly AND SignalRepository
-const NetworkQualityLayer = NetworkQualityServiceLive.pipe(
-  Layer.provide(RepositoryLayer),
-  Layer.provide(DbLayer)
-)
+// Network Quality layer - uses SqlClient directly
+const NetworkQualityLayer = Layer.provide(NetworkQualityServiceLive, DbLayer)
 
 // Gateway service layer with all dependencies
 const GatewayLayer = GatewayServiceLive.pipe(
@@ -113,6 +111,18 @@ const ServicesLayer = Layer.mergeAll(
   NetworkQualityLayer
 )
 
+// CORS headers added to every response, built once at startup
+const CORS_HEADERS = {
+  "Access-Control-Allow-Origin": "*",
+  "Access-Control-Allow-Methods": "GET, POST, PUT, DELETE, OPTIONS",
+  "Access-Control-Allow-Headers": "Content-Type, Authorization",
+}
+
+const PREFLIGHT_HEADERS = {
+  ...CORS_HEADERS,
+  "Access-Control-Max-Age": "86400",
+}
+
 // Combine all route handlers
 const router = HttpRouter.empty.pipe(
   // Health routes at root
@@ -137,12 +147,7 @@ const router = HttpRouter.empty.pipe(
       if (request.method === "OPTIONS") {
         return HttpServerResponse.empty({
           status: 204,
-          headers: {
-            "Access-Control-Allow-Origin": "*",
-            "Access-Control-Allow-Methods": "GET, POST, PUT, DELETE, OPTIONS",
-            "Access-Control-Allow-Headers": "Content-Type, Authorization",
-            "Access-Control-Max-Age": "86400",
-          },
+          headers: PREFLIGHT_HEADERS,
         })
       }
 
@@ -150,11 +155,7 @@ const router = HttpRouter.empty.pipe(
       const response = yield* httpApp
 
       // Add CORS headers to all responses
-      return HttpServerResponse.setHeaders(response, {
-        "Access-Control-Allow-Origin": "*",
-        "Access-Control-Allow-Methods": "GET, POST, PUT, DELETE, OPTIONS",
-        "Access-Control-Allow-Headers": "Content-Type, Authorization",
-      })
+      return HttpServerResponse.setHeaders(response, CORS_HEADERS)
     })
   )
 )
@@ -171,8 +172,9 @@ const startGatewayPolling = Effect.gen(function* () {
   const gatewayService = yield* GatewayServiceTag
   yield* gatewayService.startPolling()
 
-  // Log stats periodically (every 30 seconds)
-  yield* Effect.fork(
+  // Log stats periodically (every 30 seconds); the fiber is returned so
+  // shutdown can cancel it
+  return yield* Effect.fork(
     Effect.gen(function* () {
       const stats = yield* gatewayService.getStats()
       yield* Effect.log(
@@ -180,7 +182,6 @@ const startGatewayPolling = Effect.gen(function* () {
       )
     }).pipe(
       Effect.repeat(Schedule.spaced(30000)),
-      Effect.forever,
       Effect.catchAll(() => Effect.void)
     )
   )
@@ -208,6 +209,26 @@ const startNetworkQuality = Effect.gen(function* () {
   }
 })
 
+// Program to stop background work on shutdown (stops run concurrently)
+const shutdown = (statsFiber: Fiber.Fiber<unknown>) =>
+  Effect.gen(function* () {
+    yield* Fiber.interrupt(statsFiber)
+
+    const gatewayService = yield* GatewayServiceTag
+    const schedulerService = yield* SchedulerService
+    const networkQualityService = yield* NetworkQualityService
+
+    yield* Effect.all(
+      [
+        gatewayService.stopPolling(),
+        schedulerService.stop().pipe(Effect.ignore),
+        networkQualityService.stop(),
+      ],
+      { concurrency: "unbounded", discard: true }
+    )
+    yield* Effect.log("Background services stopped")
+  })
+
 // Main program
 const main = Effect.gen(function* () {
   // Log startup info
@@ -223,7 +244,7 @@ const main = Effect.gen(function* () {
   ])
 
   // Start gateway polling
-  yield* startGatewayPolling
+  const statsFiber = yield* startGatewayPolling
   yield* Effect.log("Gateway polling started")
 
   // Start speedtest scheduler (if enabled by default)
@@ -233,12 +254,13 @@ const main = Effect.gen(function* () {
   yield* startNetworkQuality
 
   // Launch the server (this runs forever)
-  // ServicesLayer is provided to the app layer for HTTP handlers
+  // HTTP handlers resolve services from the context provided below, so they
+  // share the same instances as the background pollers instead of a second copy
   yield* pipe(
     app,
-    Layer.provideMerge(ServicesLayer),
     Layer.provide(ServerLive),
-    Layer.launch
+    Layer.launch,
+    Effect.ensuring(shutdown(statsFiber))
   )
 }).pipe(Effect.provide(ServicesLayer))
 
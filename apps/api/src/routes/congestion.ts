@@ -12,8 +12,8 @@
 
 import { HttpRouter, HttpServerRequest, HttpServerResponse } from "@effect/platform"
 import { Effect, Schema } from "effect"
-import { SignalRepository } from "../services/SignalRepository.js"
-import type { SignalHistoryRecord, SpeedtestResultRecord } from "../schema/Signal.js"
+import { LOCAL_TIME_ZONE, SignalRepository } from "../services/SignalRepository.js"
+import type { HourlySignalSummary, SignalHistoryRecord, SpeedtestResultRecord } from "../schema/Signal.js"
 
 // Query params for congestion endpoint
 const CongestionQuerySchema = Schema.Struct({
@@ -75,9 +75,9 @@ const ACCEPTABLE_RSRP = -95 // dBm - above this is acceptable
 const POOR_SPEED_THRESHOLD = 25 // Mbps - below this with good signal indicates congestion
 
 // Peak hours (typically evening)
-const PEAK_HOURS = [18, 19, 20, 21, 22] // 6pm - 10pm
+const PEAK_HOURS: ReadonlySet<number> = new Set([18, 19, 20, 21, 22]) // 6pm - 10pm
 // Off-peak hours (early morning)
-const OFF_PEAK_HOURS = [2, 3, 4, 5, 6] // 2am - 6am
+const OFF_PEAK_HOURS: ReadonlySet<number> = new Set([2, 3, 4, 5, 6]) // 2am - 6am
 
 /**
  * Check if a signal record has acceptable quality
@@ -94,6 +94,22 @@ function hasAcceptableSignal(record: SignalHistoryRecord): boolean {
   return sinrOk && rsrpOk
 }
 
+/**
+ * Average serving-network SINR over the given hours of day, weighted by
+ * sample count, from the per-hour aggregates
+ */
+function averageSinrForHours(hourly: HourlySignalSummary, hours: ReadonlySet<number>): number | null {
+  let sum = 0
+  let count = 0
+  for (const row of hourly.hours) {
+    if (row.sinr_avg != null && hours.has(row.hour)) {
+      sum += row.sinr_avg * row.sinr_count
+      count += row.sinr_count
+    }
+  }
+  return count > 0 ? Math.round((sum / count) * 10) / 10 : null
+}
+
 /**
  * Calculate Pearson correlation coefficient
  */
@@ -203,12 +219,13 @@ function getRsrpAtTime(
 function generateCongestionReport(
   signalRecords: readonly SignalHistoryRecord[],
   speedtestRecords: readonly SpeedtestResultRecord[],
+  hourlySignal: HourlySignalSummary,
   periodDays: number
 ): CongestionProofReport {
   const now = new Date().toISOString()
 
-  // Filter to successful speedtests only
-  const successfulTests = speedtestRecords.filter((t) => t.status === "success")
+  // The repository only returns successful speedtests
+  const successfulTests = speedtestRecords
 
   // ============================================
   // Signal Analysis
@@ -313,25 +330,15 @@ function generateCongestionReport(
   // ============================================
   // Time Pattern Analysis
   // ============================================
-  const peakTests = successfulTests.filter((t) => {
-    const hour = new Date(t.timestamp_unix * 1000).getHours()
-    return PEAK_HOURS.includes(hour)
-  })
-
-  const offPeakTests = successfulTests.filter((t) => {
+  // One local-hour lookup per test, bucketed in a single pass. getHours()
+  // is in LOCAL_TIME_ZONE, the zone the hourly signal averages are queried in.
+  const peakTests: SpeedtestResultRecord[] = []
+  const offPeakTests: SpeedtestResultRecord[] = []
+  for (const t of successfulTests) {
     const hour = new Date(t.timestamp_unix * 1000).getHours()
-    return OFF_PEAK_HOURS.includes(hour)
-  })
-
-  const peakSignal = signalRecords.filter((r) => {
-    const hour = new Date(r.timestamp_unix * 1000).getHours()
-    return PEAK_HOURS.includes(hour)
-  })
-
-  const offPeakSignal = signalRecords.filter((r) => {
-    const hour = new Date(r.timestamp_unix * 1000).getHours()
-    return OFF_PEAK_HOURS.includes(hour)
-  })
+    if (PEAK_HOURS.has(hour)) peakTests.push(t)
+    else if (OFF_PEAK_HOURS.has(hour)) offPeakTests.push(t)
+  }
 
   const avgPeakSpeed =
     peakTests.length > 0
@@ -344,29 +351,9 @@ function generateCongestionReport(
         10
       : null
 
-  const avgPeakSinr =
-    peakSignal.length > 0
-      ? Math.round(
-          (peakSignal
-            .map((r) => r.nr_sinr ?? r.lte_sinr)
-            .filter((v): v is number => v != null)
-            .reduce((a, b) => a + b, 0) /
-            peakSignal.filter((r) => (r.nr_sinr ?? r.lte_sinr) != null).length) *
-            10
-        ) / 10
-      : null
-
-  const avgOffPeakSinr =
-    offPeakSignal.length > 0
-      ? Math.round(
-          (offPeakSignal
-            .map((r) => r.nr_sinr ?? r.lte_sinr)
-            .filter((v): v is number => v != null)
-            .reduce((a, b) => a + b, 0) /
-            offPeakSignal.filter((r) => (r.nr_sinr ?? r.lte_sinr) != null).length) *
-            10
-        ) / 10
-      : null
+  // Signal hours are bucketed by the database, not per record here
+  const avgPeakSinr = averageSinrForHours(hourlySignal, PEAK_HOURS)
+  const avgOffPeakSinr = averageSinrForHours(hourlySignal, OFF_PEAK_HOURS)
 
   const speedRatio =
     avgPeakSpeed != null && avgOffPeakSpeed != null && avgPeakSpeed > 0
@@ -518,6 +505,30 @@ function generateCongestionReport(
   }
 }
 
+// ============================================
+// Report Cache
+// ============================================
+
+/**
+ * Reports only change meaningfully when a new speedtest lands, so they are
+ * reused until then. Signal history and the period window keep moving, so
+ * reuse is also capped at a short age.
+ */
+const REPORT_CACHE_MAX_AGE_MS = 60 * 1000
+const REPORT_CACHE_MAX_ENTRIES = 16
+
+/** Most recent successful speedtests the report considers */
+const SPEEDTEST_SAMPLE_LIMIT = 1000
+
+const reportCache = new Map<
+  number,
+  {
+    latestTestUnix: number | null
+    cachedAt: number
+    report: CongestionProofReport
+  }
+>()
+
 // ============================================
 // Routes
 // ============================================
@@ -541,20 +552,43 @@ export const CongestionRoutes = HttpRouter.empty.pipe(
 
       const repo = yield* SignalRepository
 
-      // Query signal history for the period
-      const durationMinutes = days * 24 * 60
-      const signalRecords = yield* repo.querySignalHistory({
-        duration_minutes: durationMinutes,
-        resolution: "full",
-      })
+      // Serve a recent cached report while no newer speedtest exists
+      const latestTest = yield* repo.getLatestSpeedtest()
+      const latestTestUnix = latestTest?.timestamp_unix ?? null
+      const cached = reportCache.get(days)
+      if (
+        cached &&
+        cached.latestTestUnix === latestTestUnix &&
+        Date.now() - cached.cachedAt < REPORT_CACHE_MAX_AGE_MS
+      ) {
+        return HttpServerResponse.json({
+          ...cached.report,
+          generated_at: new Date().toISOString(),
+        })
+      }
 
-      // Query speedtest history (get all tests in period)
-      // We'll fetch a generous amount and filter by timestamp
+      // Query signal history and successful speedtests for the period
+      // concurrently
+      const durationMinutes = days * 24 * 60
       const cutoffUnix = Date.now() / 1000 - days * 24 * 60 * 60
-      const allSpeedtests = yield* repo.querySpeedtests(1000)
-      const speedtestRecords = allSpeedtests.filter((t) => t.timestamp_unix >= cutoffUnix)
+      const [signalRecords, speedtestRecords, hourlySignal] = yield* Effect.all(
+        [
+          repo.querySignalHistory({
+            duration_minutes: durationMinutes,
+            resolution: "full",
+          }),
+          repo.querySuccessfulSpeedtestsSince(cutoffUnix, SPEEDTEST_SAMPLE_LIMIT),
+          // Same zone as the getHours() bucketing of speedtests, so peak and
+          // off-peak signal and throughput cover the same hours
+          repo.getHourlySignalAverages(durationMinutes, LOCAL_TIME_ZONE),
+        ],
+        { concurrency: "unbounded" }
+      )
+
+      const report = generateCongestionReport(signalRecords, speedtestRecords, hourlySignal, days)
 
-      const report = generateCongestionReport(signalRecords, speedtestRecords, days)
+      if (reportCache.size >= REPORT_CACHE_MAX_ENTRIES) reportCache.clear()
+      reportCache.set(days, { latestTestUnix, cachedAt: Date.now(), report })
 
       return HttpServerResponse.json(report)
     }).pipe(
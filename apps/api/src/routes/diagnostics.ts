@@ -37,28 +37,34 @@ export const DiagnosticsRoutes = HttpRouter.empty.pipe(
       const gateway = yield* GatewayServiceTag
       const repo = yield* SignalRepository
 
-      // Get gateway stats
-      const gatewayStats = yield* gateway.getStats()
-
-      // Get latest signal for current state
-      const latestSignal = yield* repo.getLatestSignal().pipe(
-        Effect.catchAll(() => Effect.succeed(null))
-      )
-
-      // Get latest speedtest
-      const latestSpeedtest = yield* repo.getLatestSpeedtest().pipe(
-        Effect.catchAll(() => Effect.succeed(null))
-      )
-
-      // Get recent disruption stats (last 24h)
-      const disruptionStats = yield* repo.getDisruptionStats(24).pipe(
-        Effect.catchAll(() => Effect.succeed({
-          period_hours: 24,
-          total_events: 0,
-          events_by_type: {},
-          events_by_severity: {},
-          avg_duration_seconds: null,
-        }))
+      // Independent lookups, issued concurrently
+      const [gatewayStats, latestSignal, latestSpeedtest, disruptionStats] = yield* Effect.all(
+        [
+          // Gateway stats
+          gateway.getStats(),
+
+          // Latest signal for current state
+          repo.getLatestSignal().pipe(
+            Effect.catchAll(() => Effect.succeed(null))
+          ),
+
+          // Latest speedtest
+          repo.getLatestSpeedtest().pipe(
+            Effect.catchAll(() => Effect.succeed(null))
+          ),
+
+          // Recent disruption stats (last 24h)
+          repo.getDisruptionStats(24).pipe(
+            Effect.catchAll(() => Effect.succeed({
+              period_hours: 24,
+              total_events: 0,
+              events_by_type: {},
+              events_by_severity: {},
+              avg_duration_seconds: null,
+            }))
+          ),
+        ],
+        { concurrency: "unbounded" }
       )
 
       // Build diagnostics response
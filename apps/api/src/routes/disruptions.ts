@@ -34,8 +34,10 @@ export const DisruptionRoutes = HttpRouter.empty.pipe(
       const durationHours = queryParams.hours ?? 24
 
       const repo = yield* SignalRepository
-      const disruptions = yield* repo.queryDisruptions(durationHours)
-      const stats = yield* repo.getDisruptionStats(durationHours)
+      const [disruptions, stats] = yield* Effect.all(
+        [repo.queryDisruptions(durationHours), repo.getDisruptionStats(durationHours)],
+        { concurrency: "unbounded" }
+      )
 
       return yield* HttpServerResponse.json({
         period_hours: durationHours,
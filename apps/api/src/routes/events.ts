@@ -6,7 +6,7 @@
  */
 
 import { HttpRouter, HttpServerResponse } from "@effect/platform"
-import { Effect, Stream } from "effect"
+import { Chunk, Effect, Stream } from "effect"
 import { GatewayServiceTag, type SignalData, type OutageEvent } from "../services/GatewayService.js"
 import { AlertService } from "../services/AlertService.js"
 
@@ -17,12 +17,46 @@ type SSEEvent =
   | { type: "alert"; data: unknown }
   | { type: "heartbeat"; data: { timestamp: string } }
 
+const encoder = new TextEncoder()
+
+/**
+ * Encoded SSE frames keyed by the published payload. Signal, outage and
+ * alert payloads are shared by every subscriber, so each one is serialized
+ * and encoded once no matter how many clients are connected.
+ */
+const encodedFrames = new WeakMap<object, Uint8Array>()
+
 /**
- * Format an event for SSE transmission
+ * Format and encode an event for SSE transmission
  */
-const formatSSE = (event: SSEEvent): string => {
+const encodeSSE = (event: SSEEvent): Uint8Array => {
+  const cached = encodedFrames.get(event.data as object)
+  if (cached !== undefined) return cached
+
   const data = JSON.stringify(event.data)
-  return `event: ${event.type}\ndata: ${data}\n\n`
+  const frame = encoder.encode(`event: ${event.type}\ndata: ${data}\n\n`)
+  encodedFrames.set(event.data as object, frame)
+  return frame
+}
+
+/**
+ * Join the frames of one stream chunk into a single buffer, so events that
+ * arrive together (e.g. a signal update and the alert it triggered) go out
+ * in one socket write instead of one write each
+ */
+const coalesceFrames = (frames: Chunk.Chunk<Uint8Array>): Chunk.Chunk<Uint8Array> => {
+  if (frames.length <= 1) return frames
+
+  let total = 0
+  for (const frame of frames) total += frame.byteLength
+
+  const joined = new Uint8Array(total)
+  let offset = 0
+  for (const frame of frames) {
+    joined.set(frame, offset)
+    offset += frame.byteLength
+  }
+  return Chunk.of(joined)
 }
 
 /**
@@ -54,11 +88,8 @@ export const EventsRoutes = HttpRouter.empty.pipe(
         concurrency: 3,
       })
 
-      // Convert to SSE format
-      const sseStream = mergedStream.pipe(
-        Stream.map(formatSSE),
-        Stream.encodeText
-      )
+      // Convert to encoded SSE frames, one write per pulled chunk
+      const sseStream = mergedStream.pipe(Stream.map(encodeSSE), Stream.mapChunks(coalesceFrames))
 
       // Create streaming response
       return HttpServerResponse.stream(sseStream, {
@@ -12,14 +12,35 @@
 
 import { HttpRouter, HttpServerRequest, HttpServerResponse } from "@effect/platform"
 import { Effect, Schema } from "effect"
-import { NetworkQualityService, NetworkQualityError } from "../services/NetworkQualityService.js"
+import {
+  NetworkQualityService,
+  NetworkQualityError,
+  type NetworkQualityConfig,
+} from "../services/NetworkQualityService.js"
 import { RepositoryError } from "../services/SignalRepository.js"
+import { memoizeByRef } from "../lib/memoize.js"
 
 // Query params for GET /api/network-quality
 const NetworkQualityQuerySchema = Schema.Struct({
   limit: Schema.optional(Schema.NumberFromString),
 })
 
+/**
+ * Public view of the config, built once per config object rather than per
+ * request
+ */
+const configView = memoizeByRef((config: NetworkQualityConfig): object => ({
+  enabled: config.enabled,
+  interval_minutes: config.interval_minutes,
+  min_interval_minutes: config.min_interval_minutes,
+  max_interval_minutes: config.max_interval_minutes,
+  ping_count: config.ping_count,
+  targets: config.targets,
+  packet_loss_threshold_percent: config.packet_loss_threshold_percent,
+  jitter_threshold_ms: config.jitter_threshold_ms,
+  jitter_sample_fraction: config.jitter_sample_fraction,
+}))
+
 /**
  * Network Quality routes
  */
@@ -31,16 +52,7 @@ export const NetworkQualityRoutes = HttpRouter.empty.pipe(
       const service = yield* NetworkQualityService
       const config = yield* service.getConfig()
 
-      return yield* HttpServerResponse.json({
-        enabled: config.enabled,
-        interval_minutes: config.interval_minutes,
-        min_interval_minutes: config.min_interval_minutes,
-        max_interval_minutes: config.max_interval_minutes,
-        ping_count: config.ping_count,
-        targets: config.targets,
-        packet_loss_threshold_percent: config.packet_loss_threshold_percent,
-        jitter_threshold_ms: config.jitter_threshold_ms,
-      })
+      return yield* HttpServerResponse.json(configView(config))
     }).pipe(
       Effect.catchAll((error) =>
         HttpServerResponse.json(
@@ -4,13 +4,13 @@
  * Endpoints:
  * - GET /api/speedtest/history - Recent speedtest results ({results} format, frontend-compatible)
  * - GET /api/speedtest/tools - Available speedtest tools
- * - GET /api/speedtest/status - Current speedtest status
+ * - GET /api/speedtest/status - Current speedtest status (?wait=true waits for the running test)
  * - GET /api/speedtest - Recent speedtest results ({count, data} format)
  * - POST /api/speedtest - Trigger a new speedtest
  */
 
 import { HttpRouter, HttpServerRequest, HttpServerResponse } from "@effect/platform"
-import { Effect, Schema } from "effect"
+import { Duration, Effect, Schema } from "effect"
 import { SpeedtestService, SpeedtestError } from "../services/SpeedtestService.js"
 import type { NetworkContext } from "../schema/Signal.js"
 
@@ -19,6 +19,14 @@ const SpeedtestQuerySchema = Schema.Struct({
   limit: Schema.optional(Schema.NumberFromString),
 })
 
+// Query params for GET /api/speedtest/status
+const SpeedtestStatusQuerySchema = Schema.Struct({
+  wait: Schema.optional(Schema.BooleanFromString),
+})
+
+// Longest a ?wait=true status request blocks (below the server idle timeout)
+const STATUS_WAIT_TIMEOUT = Duration.seconds(150)
+
 // Request body for POST endpoint
 const TriggerSpeedtestSchema = Schema.Struct({
   server_id: Schema.optional(Schema.Number),
@@ -86,7 +94,22 @@ export const SpeedtestRoutes = HttpRouter.empty.pipe(
   HttpRouter.get(
     "/api/speedtest/status",
     Effect.gen(function* () {
+      const request = yield* HttpServerRequest.HttpServerRequest
+      const url = new URL(request.url, "http://localhost")
+
+      const queryParams = yield* Schema.decodeUnknown(SpeedtestStatusQuerySchema)({
+        wait: url.searchParams.get("wait") ?? undefined,
+      }).pipe(
+        Effect.catchAll(() => Effect.succeed({ wait: undefined }))
+      )
+
       const service = yield* SpeedtestService
+
+      // Long-poll: hold the response until the running test finishes
+      if (queryParams.wait) {
+        yield* service.awaitIdle().pipe(Effect.timeoutOption(STATUS_WAIT_TIMEOUT))
+      }
+
       const isRunning = yield* service.isRunning()
       const lastResult = yield* service.getLastResult()
 
@@ -232,6 +232,32 @@ export const TowerChangeRecord = Schema.Struct({
 
 export type TowerChangeRecord = typeof TowerChangeRecord.Type
 
+// ============================================
+// Hourly Signal Averages
+// ============================================
+
+export const HourlySignalAverage = Schema.Struct({
+  hour: Schema.Number,
+  sample_count: Schema.Number,
+  nr_sinr_avg: Schema.NullOr(Schema.Number),
+  nr_rsrp_avg: Schema.NullOr(Schema.Number),
+  lte_sinr_avg: Schema.NullOr(Schema.Number),
+  lte_rsrp_avg: Schema.NullOr(Schema.Number),
+  // SINR of the serving network (5G, falling back to 4G)
+  sinr_avg: Schema.NullOr(Schema.Number),
+  sinr_count: Schema.Number,
+})
+
+export type HourlySignalAverage = typeof HourlySignalAverage.Type
+
+export const HourlySignalSummary = Schema.Struct({
+  hours: Schema.Array(HourlySignalAverage),
+  best_hour: Schema.NullOr(Schema.Number),
+  worst_hour: Schema.NullOr(Schema.Number),
+})
+
+export type HourlySignalSummary = typeof HourlySignalSummary.Type
+
 // ============================================
 // Query Parameters
 // ============================================
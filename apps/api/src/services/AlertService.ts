@@ -28,9 +28,10 @@ import {
   type AlertType,
   type TriggerAlertInput,
   DEFAULT_ALERT_CONFIG,
-} from "../schema/Alert"
-import type { DisruptionSeverity } from "../schema/Signal"
-import { SignalRepository, type RepositoryError } from "./SignalRepository"
+} from "../schema/Alert.js"
+import type { DisruptionSeverity } from "../schema/Signal.js"
+import { SignalRepository, type RepositoryError } from "./SignalRepository.js"
+import { memoizeByRef } from "../lib/memoize.js"
 
 // ============================================
 // Alert Service Errors
@@ -52,15 +53,67 @@ export class AlertServiceError {
 interface AlertState {
   config: AlertConfig
   activeAlerts: Map<string, Alert>
+  activeTypeById: Map<string, string> // alertId -> alertType (key into activeAlerts)
   history: Alert[]
   cooldowns: Map<string, number> // alertType -> timestamp
 }
 
+// ============================================
+// Constants
+// ============================================
+
+/** Alerts kept in history; older ones are dropped as new ones arrive */
+const ALERT_HISTORY_LIMIT = 1000
+
 // ============================================
 // Helper Functions
 // ============================================
 
-const generateAlertId = (): string => String(Date.now())
+/**
+ * Append to a capped history in a single copy (rather than copying the
+ * whole history and then slicing it again)
+ */
+const appendBounded = <A>(history: readonly A[], item: A, limit: number): A[] => {
+  const next = history.slice(Math.max(0, history.length - limit + 1))
+  next.push(item)
+  return next
+}
+
+/**
+ * Unresolved alerts, built once per activeAlerts map. Every mutation
+ * replaces the map, so repeated reads (dashboard polling) reuse the list.
+ */
+const unresolvedAlerts = memoizeByRef(
+  (activeAlerts: Map<string, Alert>): readonly Alert[] =>
+    Array.from(activeAlerts.values()).filter((a) => !a.resolved)
+)
+
+// Last id handed out; ids stay unique and increasing even when several
+// alerts are raised in the same millisecond, so they can be used as keys
+let lastAlertIdMs = 0
+
+const generateAlertId = (): string => {
+  lastAlertIdMs = Math.max(Date.now(), lastAlertIdMs + 1)
+  return String(lastAlertIdMs)
+}
+
+/**
+ * Position of an alert in history. History is appended in id order, so this
+ * is a binary search rather than a scan. Returns -1 if not found.
+ */
+const findHistoryIndex = (history: readonly Alert[], alertId: string): number => {
+  const target = Number(alertId)
+  let lo = 0
+  let hi = history.length - 1
+  while (lo <= hi) {
+    const mid = (lo + hi) >>> 1
+    const id = Number(history[mid].id)
+    if (id === target) return mid
+    if (id < target) lo = mid + 1
+    else hi = mid - 1
+  }
+  return -1
+}
 
 const isCooldownExpired = (
   cooldowns: Map<string, number>,
@@ -142,6 +195,7 @@ export const AlertServiceLive = Layer.effect(
     const stateRef = yield* Ref.make<AlertState>({
       config: DEFAULT_ALERT_CONFIG,
       activeAlerts: new Map(),
+      activeTypeById: new Map(),
       history: [],
       cooldowns: new Map(),
     })
@@ -155,12 +209,21 @@ export const AlertServiceLive = Layer.effect(
 
     // Helper to add alert to state
     const addAlertToState = (alert: Alert): Effect.Effect<void> =>
-      Ref.update(stateRef, (state) => ({
-        ...state,
-        activeAlerts: new Map(state.activeAlerts).set(alert.alertType, alert),
-        history: [...state.history, alert].slice(-1000), // Keep last 1000
-        cooldowns: new Map(state.cooldowns).set(alert.alertType, Date.now()),
-      }))
+      Ref.update(stateRef, (state) => {
+        const activeTypeById = new Map(state.activeTypeById)
+        // The alert this one replaces (same type) is no longer active
+        const replaced = state.activeAlerts.get(alert.alertType)
+        if (replaced !== undefined) activeTypeById.delete(replaced.id)
+        activeTypeById.set(alert.id, alert.alertType)
+
+        return {
+          ...state,
+          activeAlerts: new Map(state.activeAlerts).set(alert.alertType, alert),
+          activeTypeById,
+          history: appendBounded(state.history, alert, ALERT_HISTORY_LIMIT),
+          cooldowns: new Map(state.cooldowns).set(alert.alertType, Date.now()),
+        }
+      })
 
     const impl: AlertServiceShape = {
       // ============================================
@@ -224,50 +287,51 @@ export const AlertServiceLive = Layer.effect(
         }),
 
       getActiveAlerts: () =>
-        Ref.get(stateRef).pipe(
-          Effect.map((s) =>
-            Array.from(s.activeAlerts.values()).filter((a) => !a.resolved)
-          )
-        ),
+        Ref.get(stateRef).pipe(Effect.map((s) => unresolvedAlerts(s.activeAlerts))),
 
       getHistory: (limit = 100, offset = 0) =>
         Ref.get(stateRef).pipe(
           Effect.map((s) => {
-            const reversed = [...s.history].reverse()
-            return reversed.slice(offset, offset + limit)
+            // Walk newest-first over just the requested page instead of
+            // copying and reversing the whole history
+            const page: Alert[] = []
+            const start = s.history.length - 1 - Math.max(0, Math.trunc(offset))
+            for (let i = start; i >= 0 && page.length < limit; i--) {
+              page.push(s.history[i])
+            }
+            return page
           })
         ),
 
       acknowledgeAlert: (alertId) =>
         Ref.modify(stateRef, (state) => {
-          let found = false
-          const newActiveAlerts = new Map(state.activeAlerts)
-
-          for (const [key, alert] of newActiveAlerts) {
-            if (alert.id === alertId) {
-              newActiveAlerts.set(key, {
-                ...alert,
-                acknowledged: true,
-                acknowledgedAt: new Date().toISOString(),
-              })
-              found = true
-              break
+          const acknowledgedAt = new Date().toISOString()
+
+          const alertType = state.activeTypeById.get(alertId)
+          const active = alertType !== undefined ? state.activeAlerts.get(alertType) : undefined
+          const newActiveAlerts =
+            alertType !== undefined && active !== undefined
+              ? new Map(state.activeAlerts).set(alertType, {
+                  ...active,
+                  acknowledged: true,
+                  acknowledgedAt,
+                })
+              : state.activeAlerts
+
+          // Also update in history (one copy, one replaced entry)
+          const index = findHistoryIndex(state.history, alertId)
+          let newHistory = state.history
+          if (index !== -1) {
+            newHistory = state.history.slice()
+            newHistory[index] = {
+              ...state.history[index],
+              acknowledged: true,
+              acknowledgedAt,
             }
           }
 
-          // Also update in history
-          const newHistory = state.history.map((a) =>
-            a.id === alertId
-              ? {
-                  ...a,
-                  acknowledged: true,
-                  acknowledgedAt: new Date().toISOString(),
-                }
-              : a
-          )
-
           return [
-            found,
+            active !== undefined,
             { ...state, activeAlerts: newActiveAlerts, history: newHistory },
           ]
         }),
@@ -275,18 +339,18 @@ export const AlertServiceLive = Layer.effect(
       clearAlert: (alertId) =>
         Effect.gen(function* () {
           const result = yield* Ref.modify(stateRef, (state) => {
-            let found = false
-            const newActiveAlerts = new Map(state.activeAlerts)
+            const alertType = state.activeTypeById.get(alertId)
+            if (alertType === undefined) return [false, state]
 
-            for (const [key, alert] of newActiveAlerts) {
-              if (alert.id === alertId) {
-                newActiveAlerts.delete(key)
-                found = true
-                break
-              }
-            }
-
-            return [found, { ...state, activeAlerts: newActiveAlerts }]
+            const newActiveAlerts = new Map(state.activeAlerts)
+            newActiveAlerts.delete(alertType)
+            const newActiveTypeById = new Map(state.activeTypeById)
+            newActiveTypeById.delete(alertId)
+
+            return [
+              true,
+              { ...state, activeAlerts: newActiveAlerts, activeTypeById: newActiveTypeById },
+            ]
           })
 
           if (result) {
@@ -306,7 +370,10 @@ export const AlertServiceLive = Layer.effect(
         Effect.gen(function* () {
           const count = yield* Ref.modify(stateRef, (state) => {
             const alertCount = state.activeAlerts.size
-            return [alertCount, { ...state, activeAlerts: new Map() }]
+            return [
+              alertCount,
+              { ...state, activeAlerts: new Map(), activeTypeById: new Map() },
+            ]
           })
 
           if (count > 0) {
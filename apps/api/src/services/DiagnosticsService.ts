@@ -13,8 +13,8 @@
  */
 
 import { Context, Effect, Layer } from "effect"
-import type { SignalHistoryRecord } from "../schema/Signal"
-import { SignalRepository, RepositoryError } from "./SignalRepository"
+import type { SignalHistoryRecord } from "../schema/Signal.js"
+import { SignalRepository, RepositoryError } from "./SignalRepository.js"
 
 // ============================================
 // Constants
@@ -187,8 +187,9 @@ const calculateStatistics = (values: readonly (number | null | undefined)[]): Si
     stdDev = 0
   }
 
-  // Median
-  const sorted = [...cleanValues].sort((a, b) => a - b)
+  // Median (typed-array sort is numeric and native, no comparator callback
+  // per comparison)
+  const sorted = Float64Array.from(cleanValues).sort()
   const mid = Math.floor(sorted.length / 2)
   const median =
     sorted.length % 2 === 0
@@ -470,72 +471,43 @@ export const DiagnosticsServiceLive = Layer.effect(
      */
     const getTimeOfDayPatterns = (durationHours = 168): Effect.Effect<TimePatternReport, RepositoryError> =>
       Effect.gen(function* () {
-        const rows = yield* queryHistoryForDuration(durationHours)
-
-        // Group by hour of day
-        const hourlyData: Map<number, {
-          nrSinr: number[]
-          nrRsrp: number[]
-          lteSinr: number[]
-          lteRsrp: number[]
-        }> = new Map()
-
-        for (let i = 0; i < 24; i++) {
-          hourlyData.set(i, { nrSinr: [], nrRsrp: [], lteSinr: [], lteRsrp: [] })
-        }
+        const summary = yield* repo.getHourlySignalAverages(durationHours * 60)
 
-        for (const row of rows) {
-          const hour = new Date(row.timestamp_unix * 1000).getHours()
-          const data = hourlyData.get(hour)!
-
-          if (row.nr_sinr != null) data.nrSinr.push(row.nr_sinr)
-          if (row.nr_rsrp != null) data.nrRsrp.push(row.nr_rsrp)
-          if (row.lte_sinr != null) data.lteSinr.push(row.lte_sinr)
-          if (row.lte_rsrp != null) data.lteRsrp.push(row.lte_rsrp)
-        }
+        const round2 = (value: number | null) =>
+          value != null ? Math.round(value * 100) / 100 : null
 
-        // Calculate statistics per hour
+        // Hours without samples still get an (empty) entry
         const patterns: Record<number, HourlyPattern> = {}
-        const validHours: [number, number][] = []
-
         for (let hour = 0; hour < 24; hour++) {
-          const data = hourlyData.get(hour)!
-          const avg5gSinr = data.nrSinr.length > 0
-            ? Math.round((data.nrSinr.reduce((a, b) => a + b, 0) / data.nrSinr.length) * 100) / 100
-            : null
-          const avg5gRsrp = data.nrRsrp.length > 0
-            ? Math.round((data.nrRsrp.reduce((a, b) => a + b, 0) / data.nrRsrp.length) * 100) / 100
-            : null
-          const avg4gSinr = data.lteSinr.length > 0
-            ? Math.round((data.lteSinr.reduce((a, b) => a + b, 0) / data.lteSinr.length) * 100) / 100
-            : null
-          const avg4gRsrp = data.lteRsrp.length > 0
-            ? Math.round((data.lteRsrp.reduce((a, b) => a + b, 0) / data.lteRsrp.length) * 100) / 100
-            : null
-
           patterns[hour] = {
             hourLabel: `${hour.toString().padStart(2, "0")}:00`,
-            sampleCount: data.nrSinr.length,
-            "5gSinrAvg": avg5gSinr,
-            "5gRsrpAvg": avg5gRsrp,
-            "4gSinrAvg": avg4gSinr,
-            "4gRsrpAvg": avg4gRsrp,
+            sampleCount: 0,
+            "5gSinrAvg": null,
+            "5gRsrpAvg": null,
+            "4gSinrAvg": null,
+            "4gRsrpAvg": null,
           }
+        }
 
-          if (avg5gSinr != null) {
-            validHours.push([hour, avg5gSinr])
+        for (const row of summary.hours) {
+          patterns[row.hour] = {
+            hourLabel: `${row.hour.toString().padStart(2, "0")}:00`,
+            sampleCount: row.sample_count,
+            "5gSinrAvg": round2(row.nr_sinr_avg),
+            "5gRsrpAvg": round2(row.nr_rsrp_avg),
+            "4gSinrAvg": round2(row.lte_sinr_avg),
+            "4gRsrpAvg": round2(row.lte_rsrp_avg),
           }
         }
 
-        // Find best and worst hours
-        let bestHour: { hour: number | null; "5gSinrAvg": number | null } = { hour: null, "5gSinrAvg": null }
-        let worstHour: { hour: number | null; "5gSinrAvg": number | null } = { hour: null, "5gSinrAvg": null }
-
-        if (validHours.length > 0) {
-          const best = validHours.reduce((a, b) => (a[1] > b[1] ? a : b))
-          const worst = validHours.reduce((a, b) => (a[1] < b[1] ? a : b))
-          bestHour = { hour: best[0], "5gSinrAvg": best[1] }
-          worstHour = { hour: worst[0], "5gSinrAvg": worst[1] }
+        // Best and worst hours are picked by the query
+        const bestHour = {
+          hour: summary.best_hour,
+          "5gSinrAvg": summary.best_hour != null ? patterns[summary.best_hour]["5gSinrAvg"] : null,
+        }
+        const worstHour = {
+          hour: summary.worst_hour,
+          "5gSinrAvg": summary.worst_hour != null ? patterns[summary.worst_hour]["5gSinrAvg"] : null,
         }
 
         return {
@@ -20,8 +20,8 @@ import type {
   DisruptionSeverity,
   DisruptionStats,
   SignalHistoryRecord,
-} from "../schema/Signal"
-import { SignalRepository, RepositoryError } from "./SignalRepository"
+} from "../schema/Signal.js"
+import { SignalRepository, RepositoryError } from "./SignalRepository.js"
 
 // ============================================
 // Types
@@ -143,57 +143,38 @@ export const DisruptionServiceLive = (
       const cooldowns = yield* Ref.make<Map<string, number>>(new Map())
 
       /**
-       * Check if an event type is in cooldown period.
+       * Keep only events whose type is out of cooldown, and start the
+       * cooldown for each kept type (one atomic update per detection pass).
        */
-      const isInCooldown = (eventType: string) =>
-        Effect.gen(function* () {
+      const takeOutOfCooldown = (events: ReadonlyArray<DetectedDisruption>) =>
+        Ref.modify(cooldowns, (map) => {
           const now = Date.now() / 1000
-          const map = yield* Ref.get(cooldowns)
-          const lastTime = map.get(eventType) ?? 0
-          return now - lastTime < config.cooldownSeconds
-        })
-
-      /**
-       * Update cooldown timestamp for an event type.
-       */
-      const updateCooldown = (eventType: string) =>
-        Ref.update(cooldowns, (map) => {
-          const newMap = new Map(map)
-          newMap.set(eventType, Date.now() / 1000)
-          return newMap
+          const next = new Map(map)
+          const accepted: Array<DetectedDisruption> = []
+          for (const event of events) {
+            const lastTime = next.get(event.eventType) ?? 0
+            if (now - lastTime < config.cooldownSeconds) continue
+            next.set(event.eventType, now)
+            accepted.push(event)
+          }
+          return [accepted, accepted.length > 0 ? next : map] as const
         })
 
       /**
-       * Maybe create an event if not in cooldown.
+       * Build the insert row for a detected event.
        */
-      const maybeCreateEvent = (
-        event: DetectedDisruption
-      ): Effect.Effect<DetectedDisruption | null, RepositoryError> =>
-        Effect.gen(function* () {
-          const inCooldown = yield* isInCooldown(event.eventType)
-          if (inCooldown) {
-            return null
-          }
-
-          yield* updateCooldown(event.eventType)
-
-          const now = new Date()
-          const insertData: DisruptionEventInsert = {
-            timestamp: now.toISOString(),
-            timestamp_unix: now.getTime() / 1000,
-            event_type: event.eventType,
-            severity: event.severity,
-            description: event.description,
-            before_state: JSON.stringify(event.beforeState),
-            after_state: JSON.stringify(event.afterState),
-            duration_seconds: undefined,
-            resolved: 0,
-            resolved_at: undefined,
-          }
-
-          yield* repo.insertDisruption(insertData)
-          return event
-        })
+      const toInsert = (event: DetectedDisruption, now: Date): DisruptionEventInsert => ({
+        timestamp: now.toISOString(),
+        timestamp_unix: now.getTime() / 1000,
+        event_type: event.eventType,
+        severity: event.severity,
+        description: event.description,
+        before_state: JSON.stringify(event.beforeState),
+        after_state: JSON.stringify(event.afterState),
+        duration_seconds: undefined,
+        resolved: 0,
+        resolved_at: undefined,
+      })
 
       /**
        * Check for 5G signal drop.
@@ -495,13 +476,21 @@ export const DisruptionServiceLive = (
               checkConnectionModeChange(current, previous),
             ].filter((e): e is DetectedDisruption => e !== null)
 
-            // Apply cooldown and persist
-            const results = yield* Effect.all(
-              potentialEvents.map((e) => maybeCreateEvent(e)),
-              { concurrency: 1 } // Sequential to avoid race conditions
-            )
+            // Common case: nothing changed, skip cooldown/persist entirely
+            if (potentialEvents.length === 0) {
+              return []
+            }
+
+            // Apply cooldown, then persist the survivors with one INSERT
+            const accepted = yield* takeOutOfCooldown(potentialEvents)
+            if (accepted.length === 0) {
+              return []
+            }
+
+            const now = new Date()
+            yield* repo.insertDisruptions(accepted.map((e) => toInsert(e, now)))
 
-            return results.filter((e): e is DetectedDisruption => e !== null)
+            return accepted
           }),
 
         getDisruptions: (durationHours = 24) =>
@@ -15,11 +15,12 @@ import {
   Duration,
   Schema,
   Queue,
+  Chunk,
 } from "effect"
 import { HttpClient, HttpClientRequest, HttpClientResponse } from "@effect/platform"
-import { SignalHistoryInsert, type ConnectionMode } from "../schema/Signal"
-import { GatewayConfigService, type GatewayConfig } from "../config/GatewayConfig"
-import { SignalRepository, type RepositoryError } from "./SignalRepository"
+import { SignalHistoryInsert, type ConnectionMode } from "../schema/Signal.js"
+import { GatewayConfigService, type GatewayConfig } from "../config/GatewayConfig.js"
+import { SignalRepository, type RepositoryError } from "./SignalRepository.js"
 
 // ============================================
 // Types
@@ -138,6 +139,7 @@ export interface GatewayStats {
 interface CircuitBreakerState {
   state: CircuitState
   failureCount: number
+  /** performance.now() of the last failure (monotonic, immune to clock steps) */
   lastFailureTime: number | null
 }
 
@@ -157,7 +159,7 @@ const makeCircuitBreaker = (failureThreshold: number, recoveryTimeout: number) =
 
     const recordFailure = Ref.update(stateRef, (s) => {
       const newFailureCount = s.failureCount + 1
-      const now = Date.now()
+      const now = performance.now()
       return {
         state: newFailureCount >= failureThreshold ? ("open" as CircuitState) : s.state,
         failureCount: newFailureCount,
@@ -170,8 +172,8 @@ const makeCircuitBreaker = (failureThreshold: number, recoveryTimeout: number) =
 
       if (s.state === "closed") return true
 
-      if (s.state === "open" && s.lastFailureTime) {
-        const elapsed = Date.now() - s.lastFailureTime
+      if (s.state === "open" && s.lastFailureTime !== null) {
+        const elapsed = performance.now() - s.lastFailureTime
         if (elapsed >= recoveryTimeout * 1000) {
           yield* Ref.update(stateRef, (curr) => ({
             ...curr,
@@ -281,6 +283,20 @@ const detectConnectionMode = (
 const hasSignalData = (metrics: SignalMetrics): boolean =>
   metrics.sinr !== null || metrics.rsrp !== null
 
+/** Shared empty band list, so polls without band data allocate nothing */
+const NO_BANDS: readonly string[] = Object.freeze([])
+
+/** Shared metrics for a radio the gateway didn't report (e.g. no 5G in LTE mode) */
+const NO_SIGNAL_METRICS: SignalMetrics = Object.freeze({
+  sinr: null,
+  rsrp: null,
+  rsrq: null,
+  rssi: null,
+  bands: NO_BANDS,
+  tower_id: null,
+  cell_id: null,
+})
+
 /**
  * Parse gateway response into SignalData
  */
@@ -289,24 +305,24 @@ const parseSignalData = (raw: GatewayResponse): SignalData => {
   const lte4g = raw.signal["4g"]
   const device = raw.device
 
-  const nr: SignalMetrics = {
-    sinr: safeFloat(nr5g?.sinr),
-    rsrp: safeFloat(nr5g?.rsrp),
-    rsrq: safeFloat(nr5g?.rsrq),
-    rssi: safeFloat(nr5g?.rssi),
-    bands: nr5g?.bands ?? [],
-    tower_id: nr5g?.gNBID ?? null,
-    cell_id: nr5g?.cid ?? null,
+  const nr: SignalMetrics = nr5g == null ? NO_SIGNAL_METRICS : {
+    sinr: safeFloat(nr5g.sinr),
+    rsrp: safeFloat(nr5g.rsrp),
+    rsrq: safeFloat(nr5g.rsrq),
+    rssi: safeFloat(nr5g.rssi),
+    bands: nr5g.bands ?? NO_BANDS,
+    tower_id: nr5g.gNBID ?? null,
+    cell_id: nr5g.cid ?? null,
   }
 
-  const lte: SignalMetrics = {
-    sinr: safeFloat(lte4g?.sinr),
-    rsrp: safeFloat(lte4g?.rsrp),
-    rsrq: safeFloat(lte4g?.rsrq),
-    rssi: safeFloat(lte4g?.rssi),
-    bands: lte4g?.bands ?? [],
-    tower_id: lte4g?.eNBID ?? null,
-    cell_id: lte4g?.cid ?? null,
+  const lte: SignalMetrics = lte4g == null ? NO_SIGNAL_METRICS : {
+    sinr: safeFloat(lte4g.sinr),
+    rsrp: safeFloat(lte4g.rsrp),
+    rsrq: safeFloat(lte4g.rsrq),
+    rssi: safeFloat(lte4g.rssi),
+    bands: lte4g.bands ?? NO_BANDS,
+    tower_id: lte4g.eNBID ?? null,
+    cell_id: lte4g.cid ?? null,
   }
 
   const now = new Date()
@@ -323,24 +339,98 @@ const parseSignalData = (raw: GatewayResponse): SignalData => {
   }
 }
 
+/**
+ * Check whether two metric snapshots carry identical readings
+ */
+const sameMetrics = (a: SignalMetrics, b: SignalMetrics): boolean =>
+  a.sinr === b.sinr &&
+  a.rsrp === b.rsrp &&
+  a.rsrq === b.rsrq &&
+  a.rssi === b.rssi &&
+  a.tower_id === b.tower_id &&
+  a.cell_id === b.cell_id
+
+/**
+ * Find SINR drops between two readings. Pure and synchronous so the common
+ * no-drop case costs nothing beyond the comparisons.
+ */
+const findSignalDrops = (
+  current: SignalData,
+  previous: SignalData,
+  thresholdDb: number
+): string[] => {
+  const drops: string[] = []
+
+  // 5G SINR drop detection
+  const prevNrSinr = previous.nr.sinr
+  if (current.nr.sinr !== null && prevNrSinr !== null) {
+    const drop = prevNrSinr - current.nr.sinr
+    if (drop > thresholdDb) {
+      drops.push(
+        `5G SINR drop detected: ${prevNrSinr.toFixed(1)} -> ${current.nr.sinr.toFixed(1)} (${drop.toFixed(1)} dB)`
+      )
+    }
+  }
+
+  // 4G SINR drop detection
+  const prevLteSinr = previous.lte.sinr
+  if (current.lte.sinr !== null && prevLteSinr !== null) {
+    const drop = prevLteSinr - current.lte.sinr
+    if (drop > thresholdDb) {
+      drops.push(
+        `4G SINR drop detected: ${prevLteSinr.toFixed(1)} -> ${current.lte.sinr.toFixed(1)} (${drop.toFixed(1)} dB)`
+      )
+    }
+  }
+
+  return drops
+}
+
+/**
+ * Create a memoized bands serializer. Bands rarely change between polls,
+ * so the last serialized string is reused while the list is unchanged.
+ */
+const makeBandsSerializer = () => {
+  let lastBands: readonly string[] = []
+  let lastJson: string | null = null
+
+  return (bands: readonly string[]): string | null => {
+    if (bands === lastBands) return lastJson
+    if (
+      bands.length === lastBands.length &&
+      bands.every((band, i) => band === lastBands[i])
+    ) {
+      lastBands = bands
+      return lastJson
+    }
+    lastBands = bands
+    lastJson = bands.length > 0 ? JSON.stringify(bands) : null
+    return lastJson
+  }
+}
+
 /**
  * Convert SignalData to SignalHistoryInsert for database
  */
-const signalDataToDbRecord = (data: SignalData): SignalHistoryInsert => ({
+const signalDataToDbRecord = (
+  data: SignalData,
+  serializeNrBands: (bands: readonly string[]) => string | null,
+  serializeLteBands: (bands: readonly string[]) => string | null
+): SignalHistoryInsert => ({
   timestamp: data.timestamp.toISOString(),
   timestamp_unix: data.timestamp_unix,
   nr_sinr: data.nr.sinr,
   nr_rsrp: data.nr.rsrp,
   nr_rsrq: data.nr.rsrq,
   nr_rssi: data.nr.rssi,
-  nr_bands: data.nr.bands.length > 0 ? JSON.stringify(data.nr.bands) : null,
+  nr_bands: serializeNrBands(data.nr.bands),
   nr_gnb_id: data.nr.tower_id,
   nr_cid: data.nr.cell_id,
   lte_sinr: data.lte.sinr,
   lte_rsrp: data.lte.rsrp,
   lte_rsrq: data.lte.rsrq,
   lte_rssi: data.lte.rssi,
-  lte_bands: data.lte.bands.length > 0 ? JSON.stringify(data.lte.bands) : null,
+  lte_bands: serializeLteBands(data.lte.bands),
   lte_enb_id: data.lte.tower_id,
   lte_cid: data.lte.cell_id,
   registration_status: data.registration_status,
@@ -370,20 +460,26 @@ const makeGatewayService = (
 
     // Outage tracking
     const inOutageRef = yield* Ref.make(false)
-    const outageStartTimeRef = yield* Ref.make<number | null>(null)
+    // Outage start: wall-clock time for reporting, monotonic time for the duration
+    const outageStartRef = yield* Ref.make<{ wallTime: number; monotonic: number } | null>(null)
     const outageErrorCountRef = yield* Ref.make(0)
 
-    // Previous values for signal drop detection
-    const prevNrSinrRef = yield* Ref.make<number | null>(null)
-    const prevLteSinrRef = yield* Ref.make<number | null>(null)
-
     // PubSub for signal updates and outage events
     const signalPubSub = yield* PubSub.unbounded<SignalData>()
     const outagePubSub = yield* PubSub.unbounded<OutageEvent>()
 
+    // Raw signal queue fed by the poll loop (sliding: drops oldest when full)
+    const signalQueue = yield* Queue.sliding<SignalData>(1024)
+
     // Batch queue for database writes (2s polling -> batch every 5 seconds)
     const batchQueue = yield* Queue.unbounded<SignalHistoryInsert>()
 
+    // Memoized band serializers (bands rarely change between polls)
+    const serializeNrBands = makeBandsSerializer()
+    const serializeLteBands = makeBandsSerializer()
+    const toDbRecord = (data: SignalData) =>
+      signalDataToDbRecord(data, serializeNrBands, serializeLteBands)
+
     // Circuit breaker
     const circuitBreaker = yield* makeCircuitBreaker(
       config.failureThreshold,
@@ -393,6 +489,11 @@ const makeGatewayService = (
     // Gateway URL
     const gatewayUrl = `http://${config.host}:${config.port}/TMI/v1/gateway?get=all`
 
+    // Config values used on every poll, resolved once
+    const requestTimeoutMs = config.timeoutSeconds * 1000
+    const pollInterval = Duration.millis(config.pollIntervalMs)
+    const sinrDropThresholdDb = config.sinrDropThresholdDb
+
     /**
      * Flush batch queue to database
      */
@@ -400,8 +501,8 @@ const makeGatewayService = (
       const records = yield* Queue.takeAll(batchQueue)
       if (records.length === 0) return
 
-      const recordsArray = Array.from(records)
-      const insertResult = yield* signalRepository.insertSignalHistory(recordsArray).pipe(
+      // Chunk.toReadonlyArray reuses the chunk's backing array when it has one
+      const insertResult = yield* signalRepository.insertSignalHistory(Chunk.toReadonlyArray(records)).pipe(
         Effect.timeout(Duration.seconds(5)),
         Effect.catchTag("TimeoutException", () =>
           Effect.gen(function* () {
@@ -411,7 +512,7 @@ const makeGatewayService = (
         ),
         Effect.catchAll((error) =>
           Effect.gen(function* () {
-            yield* Effect.logError(`Failed to persist signals: ${JSON.stringify(error)}`)
+            yield* Effect.logError("Failed to persist signals", error)
             return 0
           })
         )
@@ -422,6 +523,9 @@ const makeGatewayService = (
     // Background batch flush loop (every 5 seconds)
     const batchFlushFiberRef = yield* Ref.make<Fiber.Fiber<void, never> | null>(null)
 
+    // Background signal consumer
+    const consumerFiberRef = yield* Ref.make<Fiber.Fiber<void, never> | null>(null)
+
     /**
      * Handle poll error
      */
@@ -444,7 +548,7 @@ const makeGatewayService = (
         if (wasClosed && newCbState.state === "open" && !inOutage) {
           const now = Date.now()
           yield* Ref.set(inOutageRef, true)
-          yield* Ref.set(outageStartTimeRef, now)
+          yield* Ref.set(outageStartRef, { wallTime: now, monotonic: performance.now() })
 
           const errorCount = yield* Ref.get(outageErrorCountRef)
           const outageEvent: OutageEvent = {
@@ -463,39 +567,6 @@ const makeGatewayService = (
         }
       })
 
-    /**
-     * Detect signal quality drops
-     */
-    const detectSignalDrops = (data: SignalData) =>
-      Effect.gen(function* () {
-        const prevNrSinr = yield* Ref.get(prevNrSinrRef)
-        const prevLteSinr = yield* Ref.get(prevLteSinrRef)
-
-        // 5G SINR drop detection
-        if (data.nr.sinr !== null && prevNrSinr !== null) {
-          const drop = prevNrSinr - data.nr.sinr
-          if (drop > config.sinrDropThresholdDb) {
-            yield* Effect.logWarning(
-              `5G SINR drop detected: ${prevNrSinr.toFixed(1)} -> ${data.nr.sinr.toFixed(1)} (${drop.toFixed(1)} dB)`
-            )
-          }
-        }
-
-        // 4G SINR drop detection
-        if (data.lte.sinr !== null && prevLteSinr !== null) {
-          const drop = prevLteSinr - data.lte.sinr
-          if (drop > config.sinrDropThresholdDb) {
-            yield* Effect.logWarning(
-              `4G SINR drop detected: ${prevLteSinr.toFixed(1)} -> ${data.lte.sinr.toFixed(1)} (${drop.toFixed(1)} dB)`
-            )
-          }
-        }
-
-        // Update previous values
-        yield* Ref.set(prevNrSinrRef, data.nr.sinr)
-        yield* Ref.set(prevLteSinrRef, data.lte.sinr)
-      })
-
     /**
      * Handle outage recovery
      */
@@ -503,14 +574,14 @@ const makeGatewayService = (
       const inOutage = yield* Ref.get(inOutageRef)
       if (!inOutage) return
 
-      const outageStartTime = yield* Ref.get(outageStartTimeRef)
+      const outageStart = yield* Ref.get(outageStartRef)
       const now = Date.now()
-      const duration = outageStartTime ? (now - outageStartTime) / 1000 : 0
+      const duration = outageStart ? (performance.now() - outageStart.monotonic) / 1000 : 0
       const errorCount = yield* Ref.get(outageErrorCountRef)
       const lastError = yield* Ref.get(lastErrorRef)
 
       const outageEvent: OutageEvent = {
-        start_time: outageStartTime ?? now,
+        start_time: outageStart?.wallTime ?? now,
         end_time: now,
         duration_seconds: duration,
         error_count: errorCount,
@@ -525,7 +596,7 @@ const makeGatewayService = (
 
       // Reset outage state
       yield* Ref.set(inOutageRef, false)
-      yield* Ref.set(outageStartTimeRef, null)
+      yield* Ref.set(outageStartRef, null)
       yield* Ref.set(outageErrorCountRef, 0)
     })
 
@@ -547,7 +618,7 @@ const makeGatewayService = (
         const { status, body } = yield* Effect.tryPromise({
           try: async () => {
             const controller = new AbortController()
-            const timeoutId = setTimeout(() => controller.abort(), config.timeoutSeconds * 1000)
+            const timeoutId = setTimeout(() => controller.abort(), requestTimeoutMs)
             try {
               const res = await fetch(gatewayUrl, { signal: controller.signal })
               clearTimeout(timeoutId)
@@ -611,21 +682,56 @@ const makeGatewayService = (
         // Record success with circuit breaker
         yield* circuitBreaker.recordSuccess
 
-        // Detect signal drops
-        yield* detectSignalDrops(signalData)
-
         // Handle outage recovery
         yield* handleOutageRecovery
 
         // Publish signal update to subscribers
         yield* PubSub.publish(signalPubSub, signalData)
 
-        // Queue for batched database persistence
-        yield* Queue.offer(batchQueue, signalDataToDbRecord(signalData))
+        // Hand off to the signal consumer (drop detection + DB row building)
+        yield* Queue.offer(signalQueue, signalData)
 
         return signalData
       })
 
+    /**
+     * Signal consumer loop - drains the signal queue in batches, runs drop
+     * detection sequentially and buffers DB rows for the batch flush.
+     * Only the wait for a batch is interruptible: once taken, a batch always
+     * reaches batchQueue (unbounded, so the offer never blocks) and the
+     * shutdown flush still persists it.
+     */
+    const signalConsumerLoop = Effect.gen(function* () {
+      let previous: SignalData | null = null
+      while (true) {
+        yield* Effect.uninterruptibleMask((restore) =>
+          Effect.gen(function* () {
+            const batch = yield* restore(Queue.takeBetween(signalQueue, 1, 64))
+            const records: SignalHistoryInsert[] = []
+            for (const data of batch) {
+              records.push(toDbRecord(data))
+              const prev = previous
+              previous = data
+              // Unchanged readings cannot contain a drop; skip detection entirely
+              if (
+                prev === null ||
+                (sameMetrics(data.nr, prev.nr) && sameMetrics(data.lte, prev.lte))
+              ) {
+                continue
+              }
+              const drops = findSignalDrops(data, prev, sinrDropThresholdDb)
+              if (drops.length > 0) {
+                yield* Effect.forEach(drops, (message) => Effect.logWarning(message), {
+                  discard: true,
+                })
+              }
+            }
+            yield* Queue.offerAll(batchQueue, records)
+          })
+        )
+      }
+    })
+
     /**
      * Single poll iteration
      */
@@ -636,17 +742,15 @@ const makeGatewayService = (
       yield* pollOnce.pipe(
         Effect.catchAll((error) => {
           if (error._tag === "GatewayError") {
-            const causeInfo = error.cause instanceof Error
-              ? ` | cause: ${error.cause.message}`
-              : error.cause
-                ? ` | cause: ${String(error.cause)}`
-                : ""
-            return Effect.logWarning(`Poll error: [${error.type}] ${error.message}${causeInfo}`)
+            const message = `Poll error: [${error.type}] ${error.message}`
+            return error.cause
+              ? Effect.logWarning(message, error.cause)
+              : Effect.logWarning(message)
           }
           if (error._tag === "CircuitOpenError") {
             return Effect.logWarning(`Poll error: Circuit breaker open, recovery in ${error.recoveryTimeRemaining}ms`)
           }
-          return Effect.logWarning(`Poll error: ${error._tag} - ${JSON.stringify(error)}`)
+          return Effect.logWarning(`Poll error: ${error._tag}`, error)
         })
       )
     })
@@ -657,18 +761,18 @@ const makeGatewayService = (
     const pollLoop = Effect.gen(function* () {
       while (true) {
         yield* doPoll
-        yield* Effect.sleep(Duration.millis(config.pollIntervalMs))
+        yield* Effect.sleep(pollInterval)
       }
     }).pipe(
-      Effect.catchAll((error) => Effect.logError(`pollLoop error: ${error}`))
+      Effect.catchAll((error) => Effect.logError("pollLoop error", error))
     )
 
     /**
      * Batch flush loop (every 5 seconds)
      */
     const batchFlushLoop = flushBatch.pipe(
-      Effect.repeat(Schedule.spaced(5000)),
-      Effect.forever
+      Effect.schedule(Schedule.spaced(5000)),
+      Effect.asVoid
     )
 
     const service: GatewayService = {
@@ -685,6 +789,10 @@ const makeGatewayService = (
           const pollFiber = yield* Effect.fork(pollLoop)
           yield* Ref.set(pollFiberRef, pollFiber)
 
+          // Start signal consumer fiber
+          const consumerFiber = yield* Effect.fork(signalConsumerLoop)
+          yield* Ref.set(consumerFiberRef, consumerFiber)
+
           // Start batch flush fiber
           const flushFiber = yield* Effect.fork(batchFlushLoop)
           yield* Ref.set(batchFlushFiberRef, flushFiber)
@@ -701,19 +809,17 @@ const makeGatewayService = (
 
           yield* Ref.set(runningRef, false)
 
-          // Stop polling fiber
-          const pollFiber = yield* Ref.get(pollFiberRef)
-          if (pollFiber) {
-            yield* Fiber.interrupt(pollFiber)
-            yield* Ref.set(pollFiberRef, null)
-          }
-
-          // Stop batch flush fiber and do final flush
-          const flushFiber = yield* Ref.get(batchFlushFiberRef)
-          if (flushFiber) {
-            yield* Fiber.interrupt(flushFiber)
-            yield* Ref.set(batchFlushFiberRef, null)
-          }
+          // Interrupt poll, consumer and flush fibers together
+          const fibers = [
+            yield* Ref.getAndSet(pollFiberRef, null),
+            yield* Ref.getAndSet(consumerFiberRef, null),
+            yield* Ref.getAndSet(batchFlushFiberRef, null),
+          ].filter((fiber): fiber is Fiber.Fiber<void, never> => fiber !== null)
+          yield* Fiber.interruptAll(fibers)
+
+          // Move any signals the consumer hadn't picked up into the batch
+          const pending = yield* Queue.takeAll(signalQueue)
+          yield* Queue.offerAll(batchQueue, Chunk.map(pending, toDbRecord))
 
           // Final flush of any remaining records
           yield* flushBatch
@@ -3,7 +3,7 @@
  *
  * Pings configured targets to measure:
  * - Latency (average RTT)
- * - Jitter (latency variance)
+ * - Jitter (trimmed mean of consecutive latency differences)
  * - Packet loss percentage
  *
  * Provides:
@@ -13,12 +13,15 @@
  * - Config and stats retrieval
  */
 
-import { Context, Effect, Layer, Ref, Schedule, Fiber, Schema } from "effect"
+import { Chunk, Context, Duration, Effect, Layer, Queue, Ref, Schedule, Fiber } from "effect"
 import { SqlClient, SqlError } from "@effect/sql"
-import * as ChildProcess from "node:child_process"
 import * as os from "node:os"
 import * as fs from "node:fs"
 import * as path from "node:path"
+import * as dns from "node:dns/promises"
+import * as net from "node:net"
+import { runCommand as runProcess, type CommandOutput } from "../lib/process.js"
+import { memoizeByRef } from "../lib/memoize.js"
 
 // ============================================
 // Types
@@ -36,6 +39,7 @@ export interface NetworkQualityConfig {
   readonly max_interval_minutes: number
   readonly ping_count: number
   readonly ping_timeout_seconds: number
+  readonly jitter_sample_fraction: number
   readonly targets: readonly NetworkQualityTarget[]
   readonly packet_loss_threshold_percent: number
   readonly jitter_threshold_ms: number
@@ -62,25 +66,6 @@ export interface NetworkQualityStats {
   readonly next_test_in_seconds: number | null
 }
 
-// ============================================
-// Schemas for DB
-// ============================================
-
-export const NetworkQualityResultRecord = Schema.Struct({
-  id: Schema.optionalWith(Schema.Number, { nullable: true }),
-  timestamp: Schema.String,
-  timestamp_unix: Schema.Number,
-  target_host: Schema.String,
-  target_name: Schema.optionalWith(Schema.String, { nullable: true }),
-  ping_ms: Schema.optionalWith(Schema.Number, { nullable: true }),
-  jitter_ms: Schema.Number,
-  packet_loss_percent: Schema.Number,
-  status: Schema.String,
-  error_message: Schema.optionalWith(Schema.String, { nullable: true }),
-})
-
-export type NetworkQualityResultRecord = typeof NetworkQualityResultRecord.Type
-
 // ============================================
 // Error Types
 // ============================================
@@ -105,6 +90,7 @@ const DEFAULT_CONFIG: NetworkQualityConfig = {
   max_interval_minutes: 60,
   ping_count: 20,
   ping_timeout_seconds: 5,
+  jitter_sample_fraction: 0.5,
   targets: [
     { host: "8.8.8.8", name: "Google DNS" },
     { host: "1.1.1.1", name: "Cloudflare DNS" },
@@ -115,50 +101,40 @@ const DEFAULT_CONFIG: NetworkQualityConfig = {
   notify_on_threshold: true,
 }
 
+// Host platform, resolved once (ping flags and output format depend on it)
+const IS_WINDOWS = os.platform() === "win32"
+const IS_MAC = os.platform() === "darwin"
+
+// Config file, relative to the project root
+const CONFIG_FILE_NAME = "network_quality_config.json"
+
+// How long a resolved target address is reused before resolving again
+const DNS_CACHE_TTL_MS = 15 * 60 * 1000
+
+// Test result batches buffered for the background writer; when it is full
+// the monitor loop waits for the writer instead of dropping batches
+const RESULT_WRITE_QUEUE_CAPACITY = 64
+
+// Ping output patterns, compiled once at module load
+const WIN_TIME_RE = /time[=<](\d+)ms/gi
+const WIN_STATS_RE = /Sent\s*=\s*(\d+),\s*Received\s*=\s*(\d+)/i
+const UNIX_TIME_RE = /time[=<]?([\d.]+)\s*ms/gi
+const UNIX_STATS_RE = /(\d+)\s+packets transmitted,\s*(\d+)\s+(?:packets\s+)?received/i
+
 // ============================================
 // Helper Functions
 // ============================================
 
 /**
- * Run a command and return stdout/stderr
+ * Run a command and return stdout/stderr. ping is a real executable on
+ * every platform, so it is spawned directly rather than through a shell.
  */
 const runCommand = (
-  cmd: string[],
+  cmd: readonly string[],
   timeout: number
-): Effect.Effect<{ stdout: string; stderr: string; code: number }, NetworkQualityError> =>
-  Effect.async<{ stdout: string; stderr: string; code: number }, NetworkQualityError>(
-    (resume) => {
-      const [executable, ...args] = cmd
-      const proc = ChildProcess.spawn(executable, args, {
-        timeout: timeout * 1000,
-        shell: os.platform() === "win32",
-      })
-
-      let stdout = ""
-      let stderr = ""
-
-      proc.stdout?.on("data", (data: Buffer) => {
-        stdout += data.toString()
-      })
-
-      proc.stderr?.on("data", (data: Buffer) => {
-        stderr += data.toString()
-      })
-
-      proc.on("close", (code) => {
-        resume(Effect.succeed({ stdout, stderr, code: code ?? 1 }))
-      })
-
-      proc.on("error", (err: Error & { code?: string }) => {
-        if (err.code === "ETIMEDOUT") {
-          resume(
-            Effect.fail(new NetworkQualityError("timeout", `Command timed out after ${timeout}s`))
-          )
-        } else {
-          resume(Effect.fail(new NetworkQualityError("execution", err.message, err)))
-        }
-      })
-    }
+): Effect.Effect<CommandOutput, NetworkQualityError> =>
+  runProcess(cmd, timeout).pipe(
+    Effect.mapError((e) => new NetworkQualityError(e.type, e.message, e.cause))
   )
 
 /**
@@ -166,84 +142,104 @@ const runCommand = (
  */
 const parsePingOutput = (
   output: string,
-  isWindows: boolean
-): { latencies: number[]; packetsSent: number; packetsReceived: number } => {
-  const latencies: number[] = []
+  isWindows: boolean,
+  expectedReplies: number
+): { latencies: Float64Array; packetsSent: number; packetsReceived: number } => {
+  // Parse straight into a typed array sized for the expected reply count
+  let latencies = new Float64Array(Math.max(expectedReplies, 1))
+  let count = 0
   let packetsSent = 0
   let packetsReceived = 0
 
-  if (isWindows) {
-    // Windows ping output parsing
-    // "Reply from 8.8.8.8: bytes=32 time=15ms TTL=117"
-    // "Packets: Sent = 4, Received = 4, Lost = 0 (0% loss)"
-    const lines = output.split("\n")
-    for (const line of lines) {
-      const timeMatch = line.match(/time[=<](\d+)ms/i)
-      if (timeMatch) {
-        latencies.push(parseFloat(timeMatch[1]))
-      }
-      const statsMatch = line.match(/Sent\s*=\s*(\d+),\s*Received\s*=\s*(\d+)/i)
-      if (statsMatch) {
-        packetsSent = parseInt(statsMatch[1])
-        packetsReceived = parseInt(statsMatch[2])
-      }
-    }
-  } else {
-    // Unix ping output parsing
-    // "64 bytes from 8.8.8.8: icmp_seq=1 ttl=117 time=15.2 ms"
-    // "4 packets transmitted, 4 received, 0% packet loss"
-    const lines = output.split("\n")
-    for (const line of lines) {
-      const timeMatch = line.match(/time[=<]?([\d.]+)\s*ms/i)
-      if (timeMatch) {
-        latencies.push(parseFloat(timeMatch[1]))
-      }
-      const statsMatch = line.match(/(\d+)\s+packets transmitted,\s*(\d+)\s+(?:packets\s+)?received/i)
-      if (statsMatch) {
-        packetsSent = parseInt(statsMatch[1])
-        packetsReceived = parseInt(statsMatch[2])
-      }
+  // Windows: "Reply from 8.8.8.8: bytes=32 time=15ms TTL=117"
+  //          "Packets: Sent = 4, Received = 4, Lost = 0 (0% loss)"
+  // Unix:    "64 bytes from 8.8.8.8: icmp_seq=1 ttl=117 time=15.2 ms"
+  //          "4 packets transmitted, 4 received, 0% packet loss"
+  const timeRe = isWindows ? WIN_TIME_RE : UNIX_TIME_RE
+  const statsRe = isWindows ? WIN_STATS_RE : UNIX_STATS_RE
+
+  for (const match of output.matchAll(timeRe)) {
+    if (count === latencies.length) {
+      const grown = new Float64Array(latencies.length * 2)
+      grown.set(latencies)
+      latencies = grown
     }
+    latencies[count++] = Number(match[1])
+  }
+
+  const statsMatch = output.match(statsRe)
+  if (statsMatch) {
+    packetsSent = parseInt(statsMatch[1])
+    packetsReceived = parseInt(statsMatch[2])
   }
 
-  return { latencies, packetsSent, packetsReceived }
+  return { latencies: latencies.subarray(0, count), packetsSent, packetsReceived }
 }
 
 /**
- * Calculate jitter (mean absolute deviation of latencies)
+ * Summarize latencies: average and jitter. Jitter is the mean of the
+ * smallest `jitterSampleFraction` of absolute differences between
+ * consecutive replies, so a single lag spike doesn't dominate it.
  */
-const calculateJitter = (latencies: number[]): number => {
-  if (latencies.length < 2) return 0
-  const mean = latencies.reduce((a, b) => a + b, 0) / latencies.length
-  const deviations = latencies.map((l) => Math.abs(l - mean))
-  const jitter = deviations.reduce((a, b) => a + b, 0) / deviations.length
-  return Math.round(jitter * 100) / 100
+const summarizeLatencies = (
+  latencies: Float64Array,
+  jitterSampleFraction: number
+): { avg: number | null; jitter: number } => {
+  const n = latencies.length
+  if (n === 0) return { avg: null, jitter: 0 }
+
+  let sum = latencies[0]
+  const diffs = new Float64Array(n - 1)
+  for (let i = 1; i < n; i++) {
+    sum += latencies[i]
+    diffs[i - 1] = Math.abs(latencies[i] - latencies[i - 1])
+  }
+
+  let jitter = 0
+  if (diffs.length > 0) {
+    diffs.sort()
+    const k = Math.max(1, Math.floor(diffs.length * jitterSampleFraction))
+    let diffSum = 0
+    for (let i = 0; i < k; i++) diffSum += diffs[i]
+    jitter = diffSum / k
+  }
+
+  return {
+    avg: Math.round((sum / n) * 100) / 100,
+    jitter: Math.round(jitter * 100) / 100,
+  }
 }
 
+/**
+ * ping argv up to (not including) the host, built once per config object
+ */
+const pingCommandPrefix = memoizeByRef((config: NetworkQualityConfig): readonly string[] => {
+  const count = String(config.ping_count)
+  const timeoutSeconds = config.ping_timeout_seconds
+  // macOS: -W is in milliseconds, -t is overall timeout in seconds
+  // Linux: -W is in seconds
+  // Windows: -w is in milliseconds
+  return IS_WINDOWS
+    ? ["ping", "-n", count, "-w", String(timeoutSeconds * 1000)]
+    : IS_MAC
+      ? ["ping", "-c", count, "-W", String(timeoutSeconds * 1000)]
+      : ["ping", "-c", count, "-W", String(timeoutSeconds)]
+})
+
 /**
  * Ping a single target and measure quality
  */
 const pingTarget = (
   target: NetworkQualityTarget,
-  pingCount: number,
-  timeoutSeconds: number
+  address: string,
+  config: NetworkQualityConfig
 ): Effect.Effect<NetworkQualityResult, NetworkQualityError> =>
   Effect.gen(function* () {
-    const platform = os.platform()
-    const isWindows = platform === "win32"
-    const isMac = platform === "darwin"
-
-    // macOS: -W is in milliseconds, -t is overall timeout in seconds
-    // Linux: -W is in seconds
-    // Windows: -w is in milliseconds
-    const cmd = isWindows
-      ? ["ping", "-n", String(pingCount), "-w", String(timeoutSeconds * 1000), target.host]
-      : isMac
-        ? ["ping", "-c", String(pingCount), "-W", String(timeoutSeconds * 1000), target.host]
-        : ["ping", "-c", String(pingCount), "-W", String(timeoutSeconds), target.host]
+    const pingCount = config.ping_count
+    const cmd = [...pingCommandPrefix(config), address]
 
     const now = new Date()
-    const result = yield* runCommand(cmd, timeoutSeconds * pingCount + 10).pipe(
+    const result = yield* runCommand(cmd, config.ping_timeout_seconds * pingCount + 10).pipe(
       Effect.catchAll((e) =>
         Effect.succeed({ stdout: "", stderr: e.message, code: 1 })
       )
@@ -263,7 +259,7 @@ const pingTarget = (
       }
     }
 
-    const parsed = parsePingOutput(result.stdout, isWindows)
+    const parsed = parsePingOutput(result.stdout, IS_WINDOWS, pingCount)
     const { latencies, packetsSent, packetsReceived } = parsed
 
     const effectiveSent = packetsSent > 0 ? packetsSent : pingCount
@@ -272,12 +268,7 @@ const pingTarget = (
         ? Math.round(((effectiveSent - packetsReceived) / effectiveSent) * 100 * 100) / 100
         : 100
 
-    const avgLatency =
-      latencies.length > 0
-        ? Math.round((latencies.reduce((a, b) => a + b, 0) / latencies.length) * 100) / 100
-        : null
-
-    const jitter = calculateJitter(latencies)
+    const { avg: avgLatency, jitter } = summarizeLatencies(latencies, config.jitter_sample_fraction)
 
     return {
       target_host: target.host,
@@ -291,18 +282,64 @@ const pingTarget = (
     }
   })
 
+/**
+ * Monitor counters and timestamps, kept in one immutable record so each
+ * test updates them in a single step and getStats reads one snapshot
+ */
+interface MonitorState {
+  readonly isRunning: boolean
+  readonly testsCompleted: number
+  readonly lastTestTime: number
+  readonly nextTestTime: number
+}
+
+const INITIAL_MONITOR_STATE: MonitorState = {
+  isRunning: false,
+  testsCompleted: 0,
+  lastTestTime: 0,
+  nextTestTime: 0,
+}
+
+/**
+ * Raw network_quality_results row
+ */
+interface NetworkQualityRow {
+  timestamp: string
+  timestamp_unix: number
+  target_host: string
+  target_name: string
+  ping_ms: number | null
+  jitter_ms: number
+  packet_loss_percent: number
+  status: string
+  error_message: string | null
+}
+
+/**
+ * Convert a DB row to a NetworkQualityResult (target_name is already
+ * defaulted to target_host in SQL)
+ */
+const rowToResult = (row: NetworkQualityRow): NetworkQualityResult => ({
+  target_host: row.target_host,
+  target_name: row.target_name,
+  ping_ms: row.ping_ms,
+  jitter_ms: row.jitter_ms,
+  packet_loss_percent: row.packet_loss_percent,
+  status: row.status as "success" | "error" | "timeout",
+  timestamp: row.timestamp,
+  timestamp_unix: row.timestamp_unix,
+  error_message: row.error_message ?? undefined,
+})
+
 /**
  * Load config from file if it exists
  */
 const loadConfig = (): NetworkQualityConfig => {
   try {
-    // Try to load from project root
-    const configPath = path.resolve(process.cwd(), "network_quality_config.json")
-    if (fs.existsSync(configPath)) {
-      const content = fs.readFileSync(configPath, "utf-8")
-      const parsed = JSON.parse(content)
-      return { ...DEFAULT_CONFIG, ...parsed }
-    }
+    // Try to load from project root (a missing file throws and falls through)
+    const content = fs.readFileSync(path.resolve(process.cwd(), CONFIG_FILE_NAME), "utf-8")
+    const parsed = JSON.parse(content)
+    return { ...DEFAULT_CONFIG, ...parsed }
   } catch {
     // Ignore errors, use default
   }
@@ -335,7 +372,7 @@ export interface NetworkQualityServiceShape {
   readonly start: () => Effect.Effect<void, NetworkQualityError>
 
   /**
-   * Stop monitoring
+   * Stop monitoring and flush queued result writes
    */
   readonly stop: () => Effect.Effect<void>
 
@@ -358,7 +395,7 @@ export class NetworkQualityService extends Context.Tag("NetworkQualityService")<
 // Live Implementation
 // ============================================
 
-export const NetworkQualityServiceLive = Layer.effect(
+export const NetworkQualityServiceLive = Layer.scoped(
   NetworkQualityService,
   Effect.gen(function* () {
     const sql = yield* SqlClient.SqlClient
@@ -367,7 +404,6 @@ export const NetworkQualityServiceLive = Layer.effect(
     yield* sql.unsafe(`
       CREATE TABLE IF NOT EXISTS network_quality_results (
         id SERIAL PRIMARY KEY,
-        timestamp TEXT NOT NULL,
         timestamp_unix DOUBLE PRECISION NOT NULL,
         target_host TEXT NOT NULL,
         target_name TEXT,
@@ -379,6 +415,23 @@ export const NetworkQualityServiceLive = Layer.effect(
       )
     `)
 
+    // Tables from older installs still have the ISO timestamp column,
+    // declared NOT NULL. It keeps its data, but inserts no longer fill it,
+    // so it must accept NULL before any result is written.
+    yield* sql.unsafe(`
+      DO $$
+      BEGIN
+        IF EXISTS (
+          SELECT 1 FROM information_schema.columns
+          WHERE table_schema = current_schema()
+            AND table_name = 'network_quality_results'
+            AND column_name = 'timestamp'
+        ) THEN
+          ALTER TABLE network_quality_results ALTER COLUMN timestamp DROP NOT NULL;
+        END IF;
+      END $$
+    `)
+
     // Create index for timestamp queries
     yield* sql.unsafe(`
       CREATE INDEX IF NOT EXISTS idx_nq_timestamp ON network_quality_results(timestamp_unix DESC)
@@ -389,67 +442,142 @@ export const NetworkQualityServiceLive = Layer.effect(
 
     // State
     const configRef = yield* Ref.make<NetworkQualityConfig>(loadConfig())
-    const isRunningRef = yield* Ref.make(false)
-    const testsCompletedRef = yield* Ref.make(0)
-    const lastTestTimeRef = yield* Ref.make(0)
-    const nextTestTimeRef = yield* Ref.make(0)
+    const monitorStateRef = yield* Ref.make(INITIAL_MONITOR_STATE)
     const monitorFiberRef = yield* Ref.make<Fiber.Fiber<void, never> | null>(null)
+    const dnsCacheRef = yield* Ref.make(new Map<string, { address: string; expiresAt: number }>())
 
     /**
-     * Run a test against all targets and store results
+     * Resolve a target host to an address, reusing cached lookups for
+     * DNS_CACHE_TTL_MS. IP literals pass through; on lookup failure the
+     * hostname is handed to ping unchanged. Lookups are IPv4-only because
+     * the ping argv is built for plain `ping`, which rejects IPv6 addresses.
      */
-    const runTest = Effect.gen(function* () {
-      const config = yield* Ref.get(configRef)
-      const now = Date.now() / 1000
-
-      yield* Effect.logDebug(`Running network quality test against ${config.targets.length} targets`)
-
-      const results: NetworkQualityResult[] = []
-
-      for (const target of config.targets) {
-        const result = yield* pingTarget(target, config.ping_count, config.ping_timeout_seconds)
-        results.push(result)
-
-        // Store in database
-        yield* sql`
-          INSERT INTO network_quality_results (
-            timestamp, timestamp_unix, target_host, target_name,
-            ping_ms, jitter_ms, packet_loss_percent, status, error_message
-          ) VALUES (
-            ${result.timestamp}, ${result.timestamp_unix},
-            ${result.target_host}, ${result.target_name},
-            ${result.ping_ms ?? null}, ${result.jitter_ms},
-            ${result.packet_loss_percent}, ${result.status},
-            ${result.error_message ?? null}
-          )
-        `.pipe(Effect.mapError(mapSqlError))
-      }
-
-      yield* Ref.update(testsCompletedRef, (n) => n + 1)
-      yield* Ref.set(lastTestTimeRef, now)
+    const resolveTarget = (host: string) =>
+      Effect.gen(function* () {
+        if (net.isIP(host) !== 0) return host
+
+        const cache = yield* Ref.get(dnsCacheRef)
+        const cached = cache.get(host)
+        const now = Date.now()
+        if (cached && cached.expiresAt > now) return cached.address
+
+        return yield* Effect.tryPromise(() => dns.lookup(host, { family: 4 })).pipe(
+          Effect.tap(({ address }) =>
+            Ref.update(dnsCacheRef, (c) =>
+              new Map(c).set(host, { address, expiresAt: now + DNS_CACHE_TTL_MS })
+            )
+          ),
+          Effect.map(({ address }) => address),
+          Effect.orElseSucceed(() => host)
+        )
+      })
 
-      // Schedule next test
-      const nextTime = now + config.interval_minutes * 60
-      yield* Ref.set(nextTestTimeRef, nextTime)
+    /**
+     * Store results with one multi-row INSERT
+     */
+    const writeResults = (
+      results: readonly NetworkQualityResult[]
+    ): Effect.Effect<void, NetworkQualityError> =>
+      sql`
+        INSERT INTO network_quality_results ${sql.insert(
+          results.map((result) => ({
+            timestamp_unix: result.timestamp_unix,
+            target_host: result.target_host,
+            target_name: result.target_name,
+            ping_ms: result.ping_ms ?? null,
+            jitter_ms: result.jitter_ms,
+            packet_loss_percent: result.packet_loss_percent,
+            status: result.status,
+            error_message: result.error_message ?? null,
+          }))
+        )}
+      `.pipe(Effect.asVoid, Effect.mapError(mapSqlError))
 
-      yield* Effect.logInfo(
-        `Network quality test complete: ${results.filter((r) => r.status === "success").length}/${results.length} targets responded`
+    const writeResultsLogged = (results: readonly NetworkQualityResult[]) =>
+      writeResults(results).pipe(
+        Effect.catchAll((error) => Effect.logError("Failed to store network quality results", error))
       )
 
-      return results
+    // Background writer for the monitor loop: scheduled tests enqueue their
+    // results, so test cadence doesn't depend on database latency. Batches
+    // that queue up while a write is in flight go out together.
+    const resultWriteQueue = yield* Queue.bounded<readonly NetworkQualityResult[]>(
+      RESULT_WRITE_QUEUE_CAPACITY
+    )
+
+    const enqueueResults = (results: readonly NetworkQualityResult[]) =>
+      Queue.offer(resultWriteQueue, results).pipe(Effect.asVoid)
+
+    const drainResultWrites = Effect.gen(function* () {
+      const pending = yield* Queue.takeAll(resultWriteQueue)
+      if (Chunk.isNonEmpty(pending)) {
+        yield* writeResultsLogged(Chunk.toReadonlyArray(pending).flat())
+      }
     })
 
+    // Only the wait for work is interruptible: once batches are taken off the
+    // queue, shutdown waits for their insert instead of dropping them
+    yield* Effect.uninterruptibleMask((restore) =>
+      restore(Queue.takeBetween(resultWriteQueue, 1, RESULT_WRITE_QUEUE_CAPACITY)).pipe(
+        Effect.flatMap((batches) => writeResultsLogged(Chunk.toReadonlyArray(batches).flat()))
+      )
+    ).pipe(
+      Effect.forever,
+      Effect.forkScoped
+    )
+
+    /**
+     * Run a test against all targets and hand the results to `store`
+     */
+    const runTest = (
+      store: (results: readonly NetworkQualityResult[]) => Effect.Effect<void, NetworkQualityError>
+    ) =>
+      Effect.gen(function* () {
+        const config = yield* Ref.get(configRef)
+        const now = Date.now() / 1000
+
+        yield* Effect.logDebug(`Running network quality test against ${config.targets.length} targets`)
+
+        // Ping all targets concurrently: wall time is the slowest target, not the sum
+        const results = yield* Effect.forEach(
+          config.targets,
+          (target) =>
+            Effect.flatMap(resolveTarget(target.host), (address) =>
+              pingTarget(target, address, config)
+            ),
+          { concurrency: "unbounded" }
+        )
+
+        if (results.length > 0) {
+          yield* store(results)
+        }
+
+        // Count the test and schedule the next one in one update
+        yield* Ref.update(monitorStateRef, (state) => ({
+          ...state,
+          testsCompleted: state.testsCompleted + 1,
+          lastTestTime: now,
+          nextTestTime: now + config.interval_minutes * 60,
+        }))
+
+        yield* Effect.logInfo(
+          `Network quality test complete: ${results.filter((r) => r.status === "success").length}/${results.length} targets responded`
+        )
+
+        return results
+      })
+
     /**
-     * Monitor loop
+     * Monitor loop - a single timer per cycle; stop() interrupts the
+     * pending sleep directly
      */
     const monitorLoop = Effect.gen(function* () {
       const config = yield* Ref.get(configRef)
-      const intervalMs = config.interval_minutes * 60 * 1000
 
-      yield* runTest.pipe(
-        Effect.catchAll((e) => Effect.logError(`Network quality test failed: ${e}`)),
-        Effect.repeat(Schedule.spaced(intervalMs)),
-        Effect.forever
+      yield* runTest(enqueueResults).pipe(
+        Effect.catchAll((e) => Effect.logError("Network quality test failed", e)),
+        Effect.repeat(Schedule.spaced(Duration.minutes(config.interval_minutes))),
+        Effect.asVoid
       )
     })
 
@@ -458,10 +586,8 @@ export const NetworkQualityServiceLive = Layer.effect(
 
       getStats: () =>
         Effect.gen(function* () {
-          const isRunning = yield* Ref.get(isRunningRef)
-          const testsCompleted = yield* Ref.get(testsCompletedRef)
-          const lastTestTime = yield* Ref.get(lastTestTimeRef)
-          const nextTestTime = yield* Ref.get(nextTestTimeRef)
+          const { isRunning, testsCompleted, lastTestTime, nextTestTime } =
+            yield* Ref.get(monitorStateRef)
           const now = Date.now() / 1000
 
           return {
@@ -476,50 +602,36 @@ export const NetworkQualityServiceLive = Layer.effect(
       getResults: (limit = 100) =>
         Effect.gen(function* () {
           const rows = (yield* sql`
-            SELECT * FROM network_quality_results
+            SELECT
+              to_char(to_timestamp(timestamp_unix) AT TIME ZONE 'UTC', 'YYYY-MM-DD"T"HH24:MI:SS.MS"Z"') as timestamp,
+              timestamp_unix, target_host,
+              COALESCE(target_name, target_host) as target_name,
+              ping_ms, jitter_ms,
+              packet_loss_percent, status, error_message
+            FROM network_quality_results
             ORDER BY timestamp_unix DESC
             LIMIT ${limit}
-          `.pipe(Effect.mapError(mapSqlError))) as Array<{
-            id: number
-            timestamp: string
-            timestamp_unix: number
-            target_host: string
-            target_name: string | null
-            ping_ms: number | null
-            jitter_ms: number
-            packet_loss_percent: number
-            status: string
-            error_message: string | null
-          }>
-
-          return rows.map((row) => ({
-            target_host: row.target_host,
-            target_name: row.target_name ?? row.target_host,
-            ping_ms: row.ping_ms,
-            jitter_ms: row.jitter_ms,
-            packet_loss_percent: row.packet_loss_percent,
-            status: row.status as "success" | "error" | "timeout",
-            timestamp: row.timestamp,
-            timestamp_unix: row.timestamp_unix,
-            error_message: row.error_message ?? undefined,
-          }))
+          `.pipe(Effect.mapError(mapSqlError))) as Array<NetworkQualityRow>
+
+          return rows.map(rowToResult)
         }),
 
       start: () =>
         Effect.gen(function* () {
-          const isRunning = yield* Ref.get(isRunningRef)
-          if (isRunning) {
+          const config = yield* Ref.get(configRef)
+          const now = Date.now() / 1000
+
+          // Mark running and set the initial next test time atomically
+          const wasRunning = yield* Ref.modify(monitorStateRef, (state) =>
+            state.isRunning
+              ? ([true, state] as const)
+              : ([false, { ...state, isRunning: true, nextTestTime: now + config.interval_minutes * 60 }] as const)
+          )
+          if (wasRunning) {
             yield* Effect.logDebug("Network quality monitoring already running")
             return
           }
 
-          yield* Ref.set(isRunningRef, true)
-
-          // Set initial next test time
-          const config = yield* Ref.get(configRef)
-          const now = Date.now() / 1000
-          yield* Ref.set(nextTestTimeRef, now + config.interval_minutes * 60)
-
           // Fork the monitor loop
           const fiber = yield* Effect.fork(monitorLoop)
           yield* Ref.set(monitorFiberRef, fiber)
@@ -534,8 +646,14 @@ export const NetworkQualityServiceLive = Layer.effect(
             yield* Fiber.interrupt(fiber)
             yield* Ref.set(monitorFiberRef, null)
           }
-          yield* Ref.set(isRunningRef, false)
-          yield* Ref.set(nextTestTimeRef, 0)
+          yield* Ref.update(monitorStateRef, (state) => ({
+            ...state,
+            isRunning: false,
+            nextTestTime: 0,
+          }))
+
+          // Store anything still queued (also runs on shutdown)
+          yield* drainResultWrites
 
           yield* Effect.logInfo("Network quality monitoring stopped")
         }),
@@ -543,7 +661,9 @@ export const NetworkQualityServiceLive = Layer.effect(
       trigger: () =>
         Effect.gen(function* () {
           yield* Effect.logInfo("Triggering manual network quality test")
-          const results = yield* runTest
+          // Written before returning, so the results are already readable
+          // and a failed insert fails the trigger
+          const results = yield* runTest(writeResults)
           return results
         }),
     }
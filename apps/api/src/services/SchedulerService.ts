@@ -11,6 +11,7 @@
 import { Context, Effect, Layer, Ref, Fiber, Schedule, Duration } from "effect"
 import { SpeedtestService, type SpeedtestResult, type SpeedtestError } from "./SpeedtestService.js"
 import type { RepositoryError } from "./SignalRepository.js"
+import { memoizeByRef } from "../lib/memoize.js"
 
 // ============================================
 // Types
@@ -35,6 +36,8 @@ export interface SchedulerStats {
   readonly next_test_in_seconds: number | null
   readonly average_download_mbps: number | null
   readonly average_upload_mbps: number | null
+  readonly stddev_download_mbps: number | null
+  readonly stddev_upload_mbps: number | null
 }
 
 // ============================================
@@ -61,7 +64,8 @@ export interface SchedulerServiceShape {
   readonly getConfig: () => Effect.Effect<SchedulerConfig>
 
   /**
-   * Update scheduler configuration
+   * Update scheduler configuration (starts or stops the scheduler when
+   * `enabled` changes)
    */
   readonly updateConfig: (
     updates: Partial<SchedulerConfig>
@@ -111,6 +115,139 @@ const DEFAULT_CONFIG: SchedulerConfig = {
   delay_between_tools_seconds: 10,
 }
 
+/** Allowed ranges for numeric config fields */
+const NUMERIC_CONFIG_LIMITS = {
+  interval_minutes: { min: 1, max: 1440, label: "Interval", unit: "minutes" },
+  delay_between_tools_seconds: { min: 0, max: 300, label: "Delay between tools", unit: "seconds" },
+} as const
+
+/**
+ * Whether applying the updates would leave the config unchanged
+ */
+const isNoOpUpdate = (current: SchedulerConfig, updates: Partial<SchedulerConfig>): boolean =>
+  (Object.keys(updates) as Array<keyof SchedulerConfig>).every((key) => {
+    const next = updates[key]
+    const prev = current[key]
+    if (Array.isArray(next) && Array.isArray(prev)) {
+      return next.length === prev.length && next.every((value, i) => value === prev[i])
+    }
+    return next === prev
+  })
+
+// ============================================
+// Running Statistics
+// ============================================
+
+/**
+ * Running mean/variance accumulators for successful test speeds
+ * (Welford's online algorithm; values stay unrounded)
+ */
+interface RunningStats {
+  readonly count: number
+  readonly downloadMean: number
+  readonly downloadM2: number
+  readonly uploadMean: number
+  readonly uploadM2: number
+}
+
+const EMPTY_RUNNING_STATS: RunningStats = {
+  count: 0,
+  downloadMean: 0,
+  downloadM2: 0,
+  uploadMean: 0,
+  uploadM2: 0,
+}
+
+/**
+ * Fold one successful result into the running stats
+ */
+const addResult = (stats: RunningStats, result: SpeedtestResult): RunningStats => {
+  const count = stats.count + 1
+  const downloadDelta = result.download_mbps - stats.downloadMean
+  const downloadMean = stats.downloadMean + downloadDelta / count
+  const uploadDelta = result.upload_mbps - stats.uploadMean
+  const uploadMean = stats.uploadMean + uploadDelta / count
+  return {
+    count,
+    downloadMean,
+    downloadM2: stats.downloadM2 + downloadDelta * (result.download_mbps - downloadMean),
+    uploadMean,
+    uploadM2: stats.uploadM2 + uploadDelta * (result.upload_mbps - uploadMean),
+  }
+}
+
+const round2 = (x: number): number => Math.round(x * 100) / 100
+
+/**
+ * Sample standard deviation from a Welford m2 accumulator, rounded for display
+ */
+const stddev = (m2: number, count: number): number | null =>
+  count > 1 ? round2(Math.sqrt(m2 / (count - 1))) : null
+
+/** Next run: ISO wall-clock time for display, monotonic deadline for the countdown */
+interface NextTestTime {
+  readonly isoTime: string
+  readonly monotonic: number
+}
+
+/**
+ * Scheduler counters and times, kept in one immutable record so each result
+ * updates them in a single step and getStats reads one snapshot. Times are
+ * formatted once when they change, not on every stats poll.
+ */
+interface SchedulerState {
+  readonly testsCompleted: number
+  readonly testsFailed: number
+  readonly lastTestTime: string | null
+  readonly nextTestTime: NextTestTime | null
+  readonly runningStats: RunningStats
+}
+
+const INITIAL_SCHEDULER_STATE: SchedulerState = {
+  testsCompleted: 0,
+  testsFailed: 0,
+  lastTestTime: null,
+  nextTestTime: null,
+  runningStats: EMPTY_RUNNING_STATS,
+}
+
+// ============================================
+// Time Window Table
+// ============================================
+
+const HOURS_PER_DAY = 24
+
+/**
+ * Hour-of-week table (index = day * 24 + hour, day 0 = Sunday) with 1 for
+ * hours where tests may run
+ */
+const buildWindowTable = (config: SchedulerConfig): Uint8Array => {
+  const table = new Uint8Array(7 * HOURS_PER_DAY)
+  const start = config.time_window_start
+  const end = config.time_window_end
+
+  for (let day = 0; day < 7; day++) {
+    // Check weekend restriction
+    if (!config.run_on_weekends && (day === 0 || day === 6)) continue
+
+    for (let hour = 0; hour < HOURS_PER_DAY; hour++) {
+      let allowed = true
+      if (start !== undefined && end !== undefined) {
+        allowed =
+          start <= end
+            ? hour >= start && hour < end // Normal range (e.g., 9-17)
+            : hour >= start || hour < end // Overnight range (e.g., 22-6)
+      }
+      if (allowed) table[day * HOURS_PER_DAY + hour] = 1
+    }
+  }
+
+  return table
+}
+
+/** Window table, built once per config object */
+const windowTable = memoizeByRef(buildWindowTable)
+
 // ============================================
 // Live Implementation
 // ============================================
@@ -123,49 +260,28 @@ export const SchedulerServiceLive = Layer.effect(
     // State
     const configRef = yield* Ref.make<SchedulerConfig>(DEFAULT_CONFIG)
     const fiberRef = yield* Ref.make<Fiber.RuntimeFiber<void, SpeedtestError | RepositoryError> | null>(null)
-    const testsCompletedRef = yield* Ref.make<number>(0)
-    const testsFailedRef = yield* Ref.make<number>(0)
-    const lastTestTimeRef = yield* Ref.make<Date | null>(null)
-    const nextTestTimeRef = yield* Ref.make<Date | null>(null)
-    const downloadSumRef = yield* Ref.make<number>(0)
-    const uploadSumRef = yield* Ref.make<number>(0)
+    const stateRef = yield* Ref.make(INITIAL_SCHEDULER_STATE)
 
     /**
      * Check if current time is within the configured window
      */
     const isWithinTimeWindow = (config: SchedulerConfig): boolean => {
       const now = new Date()
-      const currentHour = now.getHours()
-      const currentDay = now.getDay() // 0 = Sunday, 6 = Saturday
-
-      // Check weekend restriction
-      if (!config.run_on_weekends && (currentDay === 0 || currentDay === 6)) {
-        return false
-      }
-
-      // Check time window
-      if (config.time_window_start !== undefined && config.time_window_end !== undefined) {
-        if (config.time_window_start <= config.time_window_end) {
-          // Normal range (e.g., 9-17)
-          return currentHour >= config.time_window_start && currentHour < config.time_window_end
-        } else {
-          // Overnight range (e.g., 22-6)
-          return currentHour >= config.time_window_start || currentHour < config.time_window_end
-        }
-      }
-
-      return true
+      return windowTable(config)[now.getDay() * HOURS_PER_DAY + now.getHours()] === 1
     }
 
     /**
      * Calculate next test time
      */
-    const calculateNextTestTime = (intervalMinutes: number): Date => {
+    const calculateNextTestTime = (intervalMinutes: number): NextTestTime => {
       const next = new Date()
       next.setMinutes(next.getMinutes() + intervalMinutes)
       next.setSeconds(0)
       next.setMilliseconds(0)
-      return next
+      // Both fields describe the same (rounded) instant, so the countdown
+      // reaches zero at the displayed time
+      const deltaMs = next.getTime() - Date.now()
+      return { isoTime: next.toISOString(), monotonic: performance.now() + deltaMs }
     }
 
     /**
@@ -173,17 +289,24 @@ export const SchedulerServiceLive = Layer.effect(
      */
     const handleResult = (result: SpeedtestResult) =>
       Effect.gen(function* () {
-        yield* Ref.set(lastTestTimeRef, new Date())
+        const lastTestTime = new Date().toISOString()
 
         if (result.status === "success") {
-          yield* Ref.update(testsCompletedRef, (n) => n + 1)
-          yield* Ref.update(downloadSumRef, (sum) => sum + result.download_mbps)
-          yield* Ref.update(uploadSumRef, (sum) => sum + result.upload_mbps)
+          yield* Ref.update(stateRef, (state) => ({
+            ...state,
+            testsCompleted: state.testsCompleted + 1,
+            lastTestTime,
+            runningStats: addResult(state.runningStats, result),
+          }))
           yield* Effect.logInfo(
             `Scheduler: Test complete (${result.tool}) - ${result.download_mbps} Mbps down, ${result.upload_mbps} Mbps up`
           )
         } else {
-          yield* Ref.update(testsFailedRef, (n) => n + 1)
+          yield* Ref.update(stateRef, (state) => ({
+            ...state,
+            testsFailed: state.testsFailed + 1,
+            lastTestTime,
+          }))
           yield* Effect.logWarning(`Scheduler: Test failed (${result.tool}) - ${result.error_message ?? result.status}`)
         }
       })
@@ -233,31 +356,27 @@ export const SchedulerServiceLive = Layer.effect(
     })
 
     /**
-     * The main scheduler loop
+     * The main scheduler loop - a single timer per interval; stop() and
+     * interval changes interrupt the pending sleep directly
      */
     const schedulerLoop = Effect.gen(function* () {
+      // Interval changes restart this fiber, so the interval is fixed here
       const config = yield* Ref.get(configRef)
-      const intervalMs = config.interval_minutes * 60 * 1000
+      const interval = Duration.minutes(config.interval_minutes)
+      const updateNextTestTime = Ref.update(stateRef, (state) => ({
+        ...state,
+        nextTestTime: calculateNextTestTime(config.interval_minutes),
+      }))
 
-      // Update next test time
-      yield* Ref.set(nextTestTimeRef, calculateNextTestTime(config.interval_minutes))
+      yield* updateNextTestTime
 
-      // Run tests on the schedule
+      // Run tests on the schedule (errors are logged, so the repeat never ends)
       yield* runScheduledTest.pipe(
         Effect.catchAll((error) =>
           Effect.logError(`Scheduler error: ${error}`)
         ),
-        Effect.repeat(
-          Schedule.spaced(Duration.millis(intervalMs)).pipe(
-            Schedule.tapInput(() =>
-              Effect.gen(function* () {
-                const currentConfig = yield* Ref.get(configRef)
-                yield* Ref.set(nextTestTimeRef, calculateNextTestTime(currentConfig.interval_minutes))
-              })
-            )
-          )
-        ),
-        Effect.forever
+        Effect.repeat(Schedule.spaced(interval).pipe(Schedule.tapInput(() => updateNextTestTime))),
+        Effect.asVoid
       )
     })
 
@@ -268,20 +387,15 @@ export const SchedulerServiceLive = Layer.effect(
         Effect.gen(function* () {
           const current = yield* Ref.get(configRef)
 
-          // Validate interval
-          if (updates.interval_minutes !== undefined) {
-            if (updates.interval_minutes < 1 || updates.interval_minutes > 1440) {
+          // Validate numeric fields against their allowed ranges
+          for (const [key, limits] of Object.entries(NUMERIC_CONFIG_LIMITS)) {
+            const value = updates[key as keyof typeof NUMERIC_CONFIG_LIMITS]
+            if (value !== undefined && (value < limits.min || value > limits.max)) {
               return yield* Effect.fail(
-                new SchedulerError("config", "Interval must be between 1 and 1440 minutes")
-              )
-            }
-          }
-
-          // Validate delay_between_tools_seconds
-          if (updates.delay_between_tools_seconds !== undefined) {
-            if (updates.delay_between_tools_seconds < 0 || updates.delay_between_tools_seconds > 300) {
-              return yield* Effect.fail(
-                new SchedulerError("config", "Delay between tools must be between 0 and 300 seconds")
+                new SchedulerError(
+                  "config",
+                  `${limits.label} must be between ${limits.min} and ${limits.max} ${limits.unit}`
+                )
               )
             }
           }
@@ -295,55 +409,68 @@ export const SchedulerServiceLive = Layer.effect(
             }
           }
 
+          // Ignore keys explicitly set to undefined
+          const definedUpdates = Object.fromEntries(
+            Object.entries(updates).filter(([, value]) => value !== undefined)
+          ) as Partial<SchedulerConfig>
+
+          // Nothing to apply: keep the current config object (and its
+          // cached window table) and leave the running loop alone
+          if (isNoOpUpdate(current, definedUpdates)) {
+            return current
+          }
+
           const newConfig: SchedulerConfig = {
             ...current,
-            ...updates,
+            ...definedUpdates,
           }
 
           yield* Ref.set(configRef, newConfig)
           yield* Effect.logInfo(`Scheduler config updated: interval=${newConfig.interval_minutes}min`)
 
-          // If scheduler is running and interval changed, restart it
           const fiber = yield* Ref.get(fiberRef)
-          if (fiber !== null && updates.interval_minutes !== undefined) {
+          const isRunning = fiber !== null
+
+          if (definedUpdates.enabled !== undefined && definedUpdates.enabled !== isRunning) {
+            // Apply the enabled toggle before returning, so a stats read right
+            // after the update already sees the new running state
+            yield* definedUpdates.enabled ? impl.start() : impl.stop()
+          } else if (fiber !== null && newConfig.interval_minutes !== current.interval_minutes) {
+            // If scheduler is running and interval changed, restart it
             yield* Effect.logInfo("Scheduler: Restarting with new interval")
             yield* Fiber.interrupt(fiber)
             const newFiber = yield* Effect.fork(schedulerLoop)
             yield* Ref.set(fiberRef, newFiber)
           }
 
-          return newConfig
+          return yield* Ref.get(configRef)
         }),
 
       getStats: () =>
         Effect.gen(function* () {
           const fiber = yield* Ref.get(fiberRef)
-          const testsCompleted = yield* Ref.get(testsCompletedRef)
-          const testsFailed = yield* Ref.get(testsFailedRef)
-          const lastTestTime = yield* Ref.get(lastTestTimeRef)
-          const nextTestTime = yield* Ref.get(nextTestTimeRef)
-          const downloadSum = yield* Ref.get(downloadSumRef)
-          const uploadSum = yield* Ref.get(uploadSumRef)
+          const { testsCompleted, testsFailed, lastTestTime, nextTestTime, runningStats } =
+            yield* Ref.get(stateRef)
 
           const isRunning = fiber !== null
-          const now = new Date()
 
+          // Countdown from the monotonic deadline so wall-clock steps can't skew it
           let nextTestInSeconds: number | null = null
           if (isRunning && nextTestTime) {
-            nextTestInSeconds = Math.max(0, Math.floor((nextTestTime.getTime() - now.getTime()) / 1000))
+            nextTestInSeconds = Math.max(0, Math.floor((nextTestTime.monotonic - performance.now()) / 1000))
           }
 
           return {
             is_running: isRunning,
             tests_completed: testsCompleted,
             tests_failed: testsFailed,
-            last_test_time: lastTestTime?.toISOString() ?? null,
-            next_test_time: nextTestTime?.toISOString() ?? null,
+            last_test_time: lastTestTime,
+            next_test_time: nextTestTime?.isoTime ?? null,
             next_test_in_seconds: nextTestInSeconds,
-            average_download_mbps:
-              testsCompleted > 0 ? Math.round((downloadSum / testsCompleted) * 100) / 100 : null,
-            average_upload_mbps:
-              testsCompleted > 0 ? Math.round((uploadSum / testsCompleted) * 100) / 100 : null,
+            average_download_mbps: runningStats.count > 0 ? round2(runningStats.downloadMean) : null,
+            average_upload_mbps: runningStats.count > 0 ? round2(runningStats.uploadMean) : null,
+            stddev_download_mbps: stddev(runningStats.downloadM2, runningStats.count),
+            stddev_upload_mbps: stddev(runningStats.uploadM2, runningStats.count),
           }
         }),
 
@@ -381,7 +508,7 @@ export const SchedulerServiceLive = Layer.effect(
 
           yield* Fiber.interrupt(fiber)
           yield* Ref.set(fiberRef, null)
-          yield* Ref.set(nextTestTimeRef, null)
+          yield* Ref.update(stateRef, (state) => ({ ...state, nextTestTime: null }))
 
           // Update config to disabled
           yield* Ref.update(configRef, (c) => ({ ...c, enabled: false }))
@@ -5,7 +5,7 @@
  * Provides CRUD operations for: signal_history, speedtest_results, disruption_events
  */
 
-import { Context, Effect, Layer, Schema } from "effect"
+import { Context, Effect, Layer, ParseResult, Schema, Stream } from "effect"
 import { SqlClient, SqlError } from "@effect/sql"
 import {
   SignalHistoryRecord,
@@ -16,8 +16,34 @@ import {
   DisruptionEventInsert,
   type DisruptionStats,
   type TowerChangeRecord,
+  type HourlySignalSummary,
   type HistoryQueryParams,
-} from "../schema/Signal"
+} from "../schema/Signal.js"
+
+/**
+ * Max rows per multi-row signal_history INSERT. 18 columns per row keeps
+ * this well under PostgreSQL's 65535 bind parameter limit.
+ */
+const SIGNAL_INSERT_CHUNK_SIZE = 500
+
+/**
+ * The server process's IANA time zone. Hour-of-day buckets use it so they
+ * match local-time (Date#getHours) bucketing in JS, whatever time zone the
+ * database session runs in.
+ */
+export const LOCAL_TIME_ZONE = Intl.DateTimeFormat().resolvedOptions().timeZone
+
+/**
+ * Columns returned by speedtest list queries. Leaves out signal_snapshot,
+ * a JSON blob that no list consumer reads.
+ */
+const SPEEDTEST_LIST_COLUMNS = [
+  "id", "timestamp", "timestamp_unix",
+  "download_mbps", "upload_mbps", "ping_ms", "jitter_ms", "packet_loss_percent",
+  "server_name", "server_location", "server_host", "server_id",
+  "client_ip", "isp", "tool", "result_url",
+  "status", "error_message", "triggered_by", "network_context", "pre_test_latency_ms",
+].join(", ")
 
 // ============================================
 // Repository Errors
@@ -57,6 +83,11 @@ export class SignalRepository extends Context.Tag("SignalRepository")<
       durationMinutes: number
     ) => Effect.Effect<ReadonlyArray<TowerChangeRecord>, RepositoryError>
 
+    readonly getHourlySignalAverages: (
+      durationMinutes: number,
+      timeZone?: string
+    ) => Effect.Effect<HourlySignalSummary, RepositoryError>
+
     // Speedtest Results CRUD
     readonly insertSpeedtest: (
       result: SpeedtestResultInsert
@@ -66,6 +97,11 @@ export class SignalRepository extends Context.Tag("SignalRepository")<
       limit: number
     ) => Effect.Effect<ReadonlyArray<SpeedtestResultRecord>, RepositoryError>
 
+    readonly querySuccessfulSpeedtestsSince: (
+      cutoffUnix: number,
+      limit: number
+    ) => Effect.Effect<ReadonlyArray<SpeedtestResultRecord>, RepositoryError>
+
     readonly getLatestSpeedtest: () => Effect.Effect<
       SpeedtestResultRecord | null,
       RepositoryError
@@ -76,6 +112,10 @@ export class SignalRepository extends Context.Tag("SignalRepository")<
       event: DisruptionEventInsert
     ) => Effect.Effect<number, RepositoryError>
 
+    readonly insertDisruptions: (
+      events: ReadonlyArray<DisruptionEventInsert>
+    ) => Effect.Effect<number, RepositoryError>
+
     readonly resolveDisruption: (
       eventId: number,
       durationSeconds: number,
@@ -102,22 +142,36 @@ export const SignalRepositoryLive = Layer.effect(
   Effect.gen(function* () {
     const sql = yield* SqlClient.SqlClient
 
+    // One array decoder per row schema, built on first use. Schema.Array
+    // creates a fresh AST, so building it per query would recompile the
+    // parser on every read of our own (already validated) rows.
+    const rowDecoders = new WeakMap<
+      object,
+      (rows: unknown) => Effect.Effect<ReadonlyArray<unknown>, ParseResult.ParseError>
+    >()
+
+    // Decode all rows with one array decoder instead of building a decoder
+    // and an effect per row
     const parseRows = <T>(
       rows: unknown[],
       schema: Schema.Schema<T>
-    ): Effect.Effect<T[], RepositoryError> =>
-      Effect.forEach(rows, (row) =>
-        Schema.decodeUnknown(schema)(row).pipe(
-          Effect.mapError(
-            (e) =>
-              new RepositoryError(
-                "parse",
-                `Failed to parse row: ${e.message}`,
-                e
-              )
-          )
+    ): Effect.Effect<ReadonlyArray<T>, RepositoryError> => {
+      let decode = rowDecoders.get(schema)
+      if (decode === undefined) {
+        decode = Schema.decodeUnknown(Schema.Array(schema))
+        rowDecoders.set(schema, decode)
+      }
+      return (decode(rows) as Effect.Effect<ReadonlyArray<T>, ParseResult.ParseError>).pipe(
+        Effect.mapError(
+          (e) =>
+            new RepositoryError(
+              "parse",
+              `Failed to parse row: ${e.message}`,
+              e
+            )
         )
       )
+    }
 
     const mapSqlError = (operation: string) => (e: SqlError.SqlError) =>
       new RepositoryError(operation, `Database error: ${e.message}`, e)
@@ -131,23 +185,29 @@ export const SignalRepositoryLive = Layer.effect(
         Effect.gen(function* () {
           if (records.length === 0) return 0
 
-          // Insert all records in a batch
-          for (const item of records) {
-            yield* sql`
-              INSERT INTO signal_history (
-                timestamp, timestamp_unix,
-                nr_sinr, nr_rsrp, nr_rsrq, nr_rssi, nr_bands, nr_gnb_id, nr_cid,
-                lte_sinr, lte_rsrp, lte_rsrq, lte_rssi, lte_bands, lte_enb_id, lte_cid,
-                registration_status, device_uptime
-              ) VALUES (
-                ${item.timestamp}, ${item.timestamp_unix},
-                ${item.nr_sinr ?? null}, ${item.nr_rsrp ?? null}, ${item.nr_rsrq ?? null}, ${item.nr_rssi ?? null},
-                ${item.nr_bands ?? null}, ${item.nr_gnb_id ?? null}, ${item.nr_cid ?? null},
-                ${item.lte_sinr ?? null}, ${item.lte_rsrp ?? null}, ${item.lte_rsrq ?? null}, ${item.lte_rssi ?? null},
-                ${item.lte_bands ?? null}, ${item.lte_enb_id ?? null}, ${item.lte_cid ?? null},
-                ${item.registration_status ?? null}, ${item.device_uptime ?? null}
-              )
-            `
+          // One multi-row INSERT per chunk (single parse + round-trip)
+          for (let i = 0; i < records.length; i += SIGNAL_INSERT_CHUNK_SIZE) {
+            const rows = records.slice(i, i + SIGNAL_INSERT_CHUNK_SIZE).map((item) => ({
+              timestamp: item.timestamp,
+              timestamp_unix: item.timestamp_unix,
+              nr_sinr: item.nr_sinr ?? null,
+              nr_rsrp: item.nr_rsrp ?? null,
+              nr_rsrq: item.nr_rsrq ?? null,
+              nr_rssi: item.nr_rssi ?? null,
+              nr_bands: item.nr_bands ?? null,
+              nr_gnb_id: item.nr_gnb_id ?? null,
+              nr_cid: item.nr_cid ?? null,
+              lte_sinr: item.lte_sinr ?? null,
+              lte_rsrp: item.lte_rsrp ?? null,
+              lte_rsrq: item.lte_rsrq ?? null,
+              lte_rssi: item.lte_rssi ?? null,
+              lte_bands: item.lte_bands ?? null,
+              lte_enb_id: item.lte_enb_id ?? null,
+              lte_cid: item.lte_cid ?? null,
+              registration_status: item.registration_status ?? null,
+              device_uptime: item.device_uptime ?? null,
+            }))
+            yield* sql`INSERT INTO signal_history ${sql.insert(rows)}`
           }
 
           return records.length
@@ -281,50 +341,114 @@ export const SignalRepositoryLive = Layer.effect(
         Effect.gen(function* () {
           const cutoff = Date.now() / 1000 - durationMinutes * 60
 
-          const rows = (yield* sql`
-            SELECT
-              timestamp, timestamp_unix,
-              nr_gnb_id, nr_cid, nr_bands,
-              lte_enb_id, lte_cid, lte_bands
-            FROM signal_history
-            WHERE timestamp_unix >= ${cutoff}
-            ORDER BY timestamp_unix ASC
-          `) as Array<{
+          // Only tower changes are kept, so rows are read through a cursor
+          // instead of materializing the whole period
+          const rows = sql<{
             timestamp: string
             timestamp_unix: number
             nr_gnb_id: number | null
             nr_cid: number | null
             lte_enb_id: number | null
             lte_cid: number | null
-          }>
+          }>`
+            SELECT
+              timestamp, timestamp_unix,
+              nr_gnb_id, nr_cid,
+              lte_enb_id, lte_cid
+            FROM signal_history
+            WHERE timestamp_unix >= ${cutoff}
+            ORDER BY timestamp_unix ASC
+          `.stream
 
           // Find tower changes
           const changes: TowerChangeRecord[] = []
           let prevNrGnb: number | null = null
           let prevLteEnb: number | null = null
 
-          for (const row of rows) {
-            const nrGnb = row.nr_gnb_id
-            const lteEnb = row.lte_enb_id
-
-            if (nrGnb !== prevNrGnb || lteEnb !== prevLteEnb) {
-              changes.push({
-                timestamp: row.timestamp,
-                timestamp_unix: row.timestamp_unix,
-                nr_gnb_id: nrGnb,
-                nr_cid: row.nr_cid,
-                lte_enb_id: lteEnb,
-                lte_cid: row.lte_cid,
-                change_type: nrGnb !== prevNrGnb ? "5g" : "4g",
-              })
-              prevNrGnb = nrGnb
-              prevLteEnb = lteEnb
-            }
-          }
+          yield* Stream.runForEachChunk(rows, (chunk) =>
+            Effect.sync(() => {
+              for (const row of chunk) {
+                const nrGnb = row.nr_gnb_id
+                const lteEnb = row.lte_enb_id
+
+                if (nrGnb !== prevNrGnb || lteEnb !== prevLteEnb) {
+                  changes.push({
+                    timestamp: row.timestamp,
+                    timestamp_unix: row.timestamp_unix,
+                    nr_gnb_id: nrGnb,
+                    nr_cid: row.nr_cid,
+                    lte_enb_id: lteEnb,
+                    lte_cid: row.lte_cid,
+                    change_type: nrGnb !== prevNrGnb ? "5g" : "4g",
+                  })
+                  prevNrGnb = nrGnb
+                  prevLteEnb = lteEnb
+                }
+              }
+            })
+          )
 
           return changes
         }).pipe(Effect.mapError(mapSqlError("getTowerHistory"))),
 
+      getHourlySignalAverages: (durationMinutes, timeZone = LOCAL_TIME_ZONE) =>
+        Effect.gen(function* () {
+          const cutoff = Date.now() / 1000 - durationMinutes * 60
+
+          // Per-hour averages plus best/worst 5G SINR hour in one round-trip.
+          // Hours are taken in the given zone, not the DB session's.
+          const rows = (yield* sql`
+            WITH hourly AS (
+              SELECT
+                EXTRACT(HOUR FROM to_timestamp(timestamp_unix) AT TIME ZONE ${timeZone})::INTEGER as hour,
+                COUNT(nr_sinr)::INTEGER as sample_count,
+                AVG(nr_sinr) as nr_sinr_avg,
+                AVG(nr_rsrp) as nr_rsrp_avg,
+                AVG(lte_sinr) as lte_sinr_avg,
+                AVG(lte_rsrp) as lte_rsrp_avg,
+                AVG(COALESCE(nr_sinr, lte_sinr)) as sinr_avg,
+                COUNT(COALESCE(nr_sinr, lte_sinr))::INTEGER as sinr_count
+              FROM signal_history
+              WHERE timestamp_unix >= ${cutoff}
+              GROUP BY 1
+            )
+            SELECT
+              hourly.*,
+              (SELECT hour FROM hourly WHERE nr_sinr_avg IS NOT NULL
+                ORDER BY nr_sinr_avg DESC LIMIT 1) as best_hour,
+              (SELECT hour FROM hourly WHERE nr_sinr_avg IS NOT NULL
+                ORDER BY nr_sinr_avg ASC LIMIT 1) as worst_hour
+            FROM hourly
+            ORDER BY hour
+          `) as Array<{
+            hour: number
+            sample_count: number
+            nr_sinr_avg: number | null
+            nr_rsrp_avg: number | null
+            lte_sinr_avg: number | null
+            lte_rsrp_avg: number | null
+            sinr_avg: number | null
+            sinr_count: number
+            best_hour: number | null
+            worst_hour: number | null
+          }>
+
+          return {
+            hours: rows.map((row) => ({
+              hour: row.hour,
+              sample_count: row.sample_count,
+              nr_sinr_avg: row.nr_sinr_avg,
+              nr_rsrp_avg: row.nr_rsrp_avg,
+              lte_sinr_avg: row.lte_sinr_avg,
+              lte_rsrp_avg: row.lte_rsrp_avg,
+              sinr_avg: row.sinr_avg,
+              sinr_count: row.sinr_count,
+            })),
+            best_hour: rows[0]?.best_hour ?? null,
+            worst_hour: rows[0]?.worst_hour ?? null,
+          }
+        }).pipe(Effect.mapError(mapSqlError("getHourlySignalAverages"))),
+
       // ============================================
       // Speedtest Operations
       // ============================================
@@ -357,7 +481,7 @@ export const SignalRepositoryLive = Layer.effect(
       querySpeedtests: (limit) =>
         Effect.gen(function* () {
           const rows = yield* sql`
-            SELECT * FROM speedtest_results
+            SELECT ${sql.literal(SPEEDTEST_LIST_COLUMNS)} FROM speedtest_results
             ORDER BY timestamp_unix DESC
             LIMIT ${limit}
           `
@@ -365,6 +489,19 @@ export const SignalRepositoryLive = Layer.effect(
           return yield* parseRows(rows, SpeedtestResultRecord)
         }).pipe(Effect.mapError(mapSqlError("querySpeedtests"))),
 
+      querySuccessfulSpeedtestsSince: (cutoffUnix, limit) =>
+        Effect.gen(function* () {
+          // Served by idx_speedtest_status_timestamp
+          const rows = yield* sql`
+            SELECT ${sql.literal(SPEEDTEST_LIST_COLUMNS)} FROM speedtest_results
+            WHERE status = 'success' AND timestamp_unix >= ${cutoffUnix}
+            ORDER BY timestamp_unix DESC
+            LIMIT ${limit}
+          `
+
+          return yield* parseRows(rows, SpeedtestResultRecord)
+        }).pipe(Effect.mapError(mapSqlError("querySuccessfulSpeedtestsSince"))),
+
       getLatestSpeedtest: () =>
         Effect.gen(function* () {
           const rows = yield* sql`
@@ -408,6 +545,30 @@ export const SignalRepositoryLive = Layer.effect(
           return (rows[0] as { id: number }).id
         }).pipe(Effect.mapError(mapSqlError("insertDisruption"))),
 
+      insertDisruptions: (events) =>
+        Effect.gen(function* () {
+          if (events.length === 0) return 0
+
+          // All events from one detection pass in a single multi-row INSERT
+          yield* sql`
+            INSERT INTO disruption_events ${sql.insert(
+              events.map((event) => ({
+                timestamp: event.timestamp,
+                timestamp_unix: event.timestamp_unix,
+                event_type: event.event_type,
+                severity: event.severity,
+                description: event.description,
+                before_state: event.before_state ?? null,
+                after_state: event.after_state ?? null,
+                duration_seconds: event.duration_seconds ?? null,
+                resolved: event.resolved,
+                resolved_at: event.resolved_at ?? null,
+              }))
+            )}
+          `
+          return events.length
+        }).pipe(Effect.mapError(mapSqlError("insertDisruptions"))),
+
       resolveDisruption: (eventId, durationSeconds, resolvedAt, afterState) =>
         Effect.gen(function* () {
           if (afterState !== undefined) {
@@ -445,52 +606,50 @@ export const SignalRepositoryLive = Layer.effect(
         Effect.gen(function* () {
           const cutoff = Date.now() / 1000 - durationHours * 60 * 60
 
-          // Total count
-          const totalRows = yield* sql`
-            SELECT COUNT(*)::INTEGER as count FROM disruption_events WHERE timestamp_unix >= ${cutoff}
-          `
-          const totalRow = totalRows[0] as { count: number }
-
-          // By type
-          const byTypeRows = (yield* sql`
-            SELECT event_type, COUNT(*)::INTEGER as count
-            FROM disruption_events
-            WHERE timestamp_unix >= ${cutoff}
-            GROUP BY event_type
-          `) as Array<{ event_type: string; count: number }>
-
-          // By severity
-          const bySeverityRows = (yield* sql`
-            SELECT severity, COUNT(*)::INTEGER as count
+          // Total, per-type and per-severity counts in one round-trip; the
+          // grand-total grouping also carries the average duration
+          const rows = (yield* sql`
+            SELECT
+              event_type,
+              severity,
+              COUNT(*)::INTEGER as count,
+              AVG(duration_seconds) as avg_duration,
+              GROUPING(event_type)::INTEGER as type_rolled_up,
+              GROUPING(severity)::INTEGER as severity_rolled_up
             FROM disruption_events
             WHERE timestamp_unix >= ${cutoff}
-            GROUP BY severity
-          `) as Array<{ severity: string; count: number }>
-
-          // Average duration
-          const avgRows = yield* sql`
-            SELECT AVG(duration_seconds) as avg_duration
-            FROM disruption_events
-            WHERE timestamp_unix >= ${cutoff} AND duration_seconds IS NOT NULL
-          `
-          const avgRow = avgRows[0] as { avg_duration: number | null }
+            GROUP BY GROUPING SETS ((event_type), (severity), ())
+          `) as Array<{
+            event_type: string | null
+            severity: string | null
+            count: number
+            avg_duration: number | null
+            type_rolled_up: number
+            severity_rolled_up: number
+          }>
 
+          let totalEvents = 0
+          let avgDuration: number | null = null
           const eventsByType: Record<string, number> = {}
-          for (const row of byTypeRows) {
-            eventsByType[row.event_type] = row.count
-          }
-
           const eventsBySeverity: Record<string, number> = {}
-          for (const row of bySeverityRows) {
-            eventsBySeverity[row.severity] = row.count
+
+          for (const row of rows) {
+            if (row.type_rolled_up && row.severity_rolled_up) {
+              totalEvents = row.count
+              avgDuration = row.avg_duration
+            } else if (row.severity_rolled_up) {
+              eventsByType[row.event_type!] = row.count
+            } else {
+              eventsBySeverity[row.severity!] = row.count
+            }
           }
 
           return {
             period_hours: durationHours,
-            total_events: totalRow?.count ?? 0,
+            total_events: totalEvents,
             events_by_type: eventsByType,
             events_by_severity: eventsBySeverity,
-            avg_duration_seconds: avgRow?.avg_duration ?? null,
+            avg_duration_seconds: avgDuration,
           }
         }).pipe(Effect.mapError(mapSqlError("getDisruptionStats"))),
     }
@@ -6,20 +6,22 @@
  * Provides:
  * - Multi-tool speedtest execution (Ookla CLI, speedtest-cli)
  * - Network context detection (baseline, idle, light, busy)
- * - Pre-test latency probing
+ * - Pre-test latency probing (TCP connect, ping fallback)
  * - History persistence via SignalRepository
  * - Tool availability detection
  */
 
-import { Context, Effect, Layer, Ref, Schema, Duration } from "effect"
-import { SignalRepository, type RepositoryError } from "./SignalRepository"
+import { Context, Effect, Layer, Ref, Schema, Duration, Stream, SubscriptionRef } from "effect"
+import { SignalRepository, type RepositoryError } from "./SignalRepository.js"
 import {
   type SpeedtestResultRecord,
   type SpeedtestResultInsert,
   type NetworkContext,
-} from "../schema/Signal"
-import type { SignalData } from "./GatewayService"
-import * as ChildProcess from "node:child_process"
+} from "../schema/Signal.js"
+import type { SignalData } from "./GatewayService.js"
+import { runCommand as runProcess, type CommandOutput } from "../lib/process.js"
+import { memoizeByRef } from "../lib/memoize.js"
+import * as net from "node:net"
 import * as os from "node:os"
 
 // ============================================
@@ -100,6 +102,25 @@ interface ToolResult {
   error_message: string | null
 }
 
+/**
+ * Fields read from `speedtest --format=json` (Ookla). Everything is
+ * optional since the CLI omits sections on partial results.
+ */
+interface OoklaJson {
+  readonly download?: { readonly bandwidth?: number }
+  readonly upload?: { readonly bandwidth?: number }
+  readonly ping?: { readonly latency?: number; readonly jitter?: number }
+  readonly server?: {
+    readonly id?: number
+    readonly name?: string
+    readonly location?: string
+    readonly host?: string
+  }
+  readonly interface?: { readonly externalIp?: string }
+  readonly isp?: string
+  readonly result?: { readonly url?: string }
+}
+
 // ============================================
 // Constants
 // ============================================
@@ -130,103 +151,82 @@ const DEFAULT_CONFIG: SpeedtestConfig = {
   busy_latency_multiplier: 2.5,
 }
 
+// Host platform, resolved once (shell use and ping flags/output depend on it)
+const IS_WINDOWS = os.platform() === "win32"
+
+/** Windows ping summary: "Average = 15ms" */
+const WINDOWS_PING_AVG = /average\s*=\s*([\d.]+)\s*ms/i
+
+/** Unix ping summary: "rtt min/avg/max/mdev = 10.123/15.456/20.789/3.456 ms" */
+const UNIX_PING_AVG = /min\/avg\/[^=]*=\s*[\d.]+\/([\d.]+)\//
+
+/** Tool argv, shared across runs; only Ookla adds per-run arguments (to a copy) */
+const OOKLA_CMD = ["speedtest", "--format=json", "--accept-license", "--accept-gdpr"] as const
+const SPEEDTEST_CLI_CMD = ["speedtest-cli", "--json"] as const
+const FAST_CLI_CMD = ["bunx", "fast-cli", "--json", "--upload"] as const
+
 // ============================================
 // Helper Functions
 // ============================================
 
 /**
- * Run a command and return stdout/stderr
+ * Run a command and return stdout/stderr. bunx is a .cmd shim on Windows,
+ * so commands go through the shell there.
  */
 const runCommand = (
-  cmd: string[],
+  cmd: readonly string[],
   timeout: number
-): Effect.Effect<{ stdout: string; stderr: string; code: number }, SpeedtestError> =>
-  Effect.async<{ stdout: string; stderr: string; code: number }, SpeedtestError>(
-    (resume) => {
-      const [executable, ...args] = cmd
-      const isWindows = os.platform() === "win32"
-
-      const proc = ChildProcess.spawn(executable, args, {
-        shell: isWindows,
-        windowsHide: true,
-      })
-
-      let stdout = ""
-      let stderr = ""
-      let resolved = false
-
-      // Manual timeout handling (spawn doesn't support timeout option)
-      const timeoutId = setTimeout(() => {
-        if (!resolved) {
-          resolved = true
-          proc.kill("SIGTERM")
-          resume(Effect.fail(new SpeedtestError("timeout", `Command timed out after ${timeout}s`)))
-        }
-      }, timeout * 1000)
-
-      proc.stdout?.on("data", (data: Buffer) => {
-        stdout += data.toString()
-      })
-
-      proc.stderr?.on("data", (data: Buffer) => {
-        stderr += data.toString()
-      })
-
-      proc.on("close", (code) => {
-        if (!resolved) {
-          resolved = true
-          clearTimeout(timeoutId)
-          resume(Effect.succeed({ stdout, stderr, code: code ?? 1 }))
-        }
-      })
-
-      proc.on("error", (err: Error & { code?: string }) => {
-        if (!resolved) {
-          resolved = true
-          clearTimeout(timeoutId)
-          resume(Effect.fail(new SpeedtestError("execution", err.message, err)))
-        }
-      })
-    }
+): Effect.Effect<CommandOutput, SpeedtestError> =>
+  runProcess(cmd, timeout, { shell: IS_WINDOWS }).pipe(
+    Effect.mapError((e) => new SpeedtestError(e.type, e.message, e.cause))
   )
 
 /**
- * Check if Ookla speedtest CLI is available
+ * Check if an executable is on PATH (a lookup, no process spawned)
+ */
+const isOnPath = (executable: string): Effect.Effect<boolean> =>
+  Effect.sync(() => Bun.which(executable) !== null)
+
+/**
+ * Check if Ookla speedtest CLI is available. The Python speedtest-cli can
+ * also install a `speedtest` binary, so `--version` is still run to tell
+ * them apart, but only when something of that name exists.
  */
 const isOoklaAvailable = (): Effect.Effect<boolean> =>
-  runCommand(["speedtest", "--version"], 5).pipe(
-    Effect.map(
-      ({ stdout, code }) => code === 0 && stdout.toLowerCase().includes("ookla")
-    ),
-    Effect.catchAll(() => Effect.succeed(false))
+  Effect.flatMap(isOnPath("speedtest"), (found) =>
+    found
+      ? runCommand(["speedtest", "--version"], 5).pipe(
+          Effect.map(
+            ({ stdout, code }) => code === 0 && stdout.toLowerCase().includes("ookla")
+          ),
+          Effect.catchAll(() => Effect.succeed(false))
+        )
+      : Effect.succeed(false)
   )
 
 /**
  * Check if speedtest-cli (Python) is available
  */
-const isSpeedtestCliAvailable = (): Effect.Effect<boolean> =>
-  runCommand(["speedtest-cli", "--version"], 5).pipe(
-    Effect.map(({ code }) => code === 0),
-    Effect.catchAll(() => Effect.succeed(false))
-  )
+const isSpeedtestCliAvailable = (): Effect.Effect<boolean> => isOnPath("speedtest-cli")
 
 /**
- * Check if fast-cli (Netflix) is available via bunx
+ * Check if fast-cli (Netflix) is available via bunx. bunx may fetch the
+ * package, so the probe only runs when bunx itself is on PATH.
  */
 const isFastCliAvailable = (): Effect.Effect<boolean> =>
-  runCommand(["bunx", "fast-cli", "--help"], 10).pipe(
-    Effect.map(({ code, stdout }) => code === 0 && stdout.includes("fast.com")),
-    Effect.catchAll(() => Effect.succeed(false))
+  Effect.flatMap(isOnPath("bunx"), (found) =>
+    found
+      ? runCommand(["bunx", "fast-cli", "--help"], 10).pipe(
+          Effect.map(({ code, stdout }) => code === 0 && stdout.includes("fast.com")),
+          Effect.catchAll(() => Effect.succeed(false))
+        )
+      : Effect.succeed(false)
   )
 
 /**
  * Check if curl is available (needed for CDN tests)
  */
-const isCurlAvailable = (): Effect.Effect<boolean> =>
-  runCommand(["curl", "--version"], 5).pipe(
-    Effect.map(({ code }) => code === 0),
-    Effect.catchAll(() => Effect.succeed(false))
-  )
+const isCurlAvailable = (): Effect.Effect<boolean> => isOnPath("curl")
 
 /**
  * Run CDN-based speed test using curl.
@@ -335,24 +335,24 @@ const runCdnTest = (
   })
 
 /**
- * Detect available speedtest tools
+ * Detect available speedtest tools. The probes are independent, so they run
+ * concurrently and startup waits only for the slowest one.
  */
 const detectAvailableTools = (): Effect.Effect<string[]> =>
   Effect.gen(function* () {
+    const [fastOk, ooklaOk, cliOk, curlOk] = yield* Effect.all(
+      [isFastCliAvailable(), isOoklaAvailable(), isSpeedtestCliAvailable(), isCurlAvailable()],
+      { concurrency: "unbounded" }
+    )
+
     const available: string[] = []
 
-    // Check fast-cli first (preferred)
-    const fastOk = yield* isFastCliAvailable()
+    // fast-cli first (preferred)
     if (fastOk) available.push("fast-cli")
-
-    const ooklaOk = yield* isOoklaAvailable()
     if (ooklaOk) available.push("ookla-speedtest")
-
-    const cliOk = yield* isSpeedtestCliAvailable()
     if (cliOk) available.push("speedtest-cli")
 
     // CDN tools require curl
-    const curlOk = yield* isCurlAvailable()
     if (curlOk) {
       available.push("cdn-cloudflare")
       available.push("cdn-aws")
@@ -363,6 +363,28 @@ const detectAvailableTools = (): Effect.Effect<string[]> =>
     return available
   })
 
+/**
+ * Map Ookla JSON to a ToolResult in one pass over its fixed sections
+ */
+const extractOoklaResult = ({
+  download, upload, ping, server, interface: iface, isp, result,
+}: OoklaJson): ToolResult => ({
+  status: "success",
+  download_mbps: Math.round(((download?.bandwidth ?? 0) * 8) / 1_000_000 * 100) / 100,
+  upload_mbps: Math.round(((upload?.bandwidth ?? 0) * 8) / 1_000_000 * 100) / 100,
+  ping_ms: Math.round((ping?.latency ?? 0) * 10) / 10,
+  jitter_ms: ping?.jitter ? Math.round(ping.jitter * 10) / 10 : null,
+  server_name: server?.name ?? null,
+  server_location: server?.location ?? null,
+  server_host: server?.host ?? null,
+  server_id: server?.id ?? null,
+  client_ip: iface?.externalIp ?? null,
+  isp: isp ?? null,
+  tool: "ookla-speedtest",
+  result_url: result?.url ?? null,
+  error_message: null,
+})
+
 /**
  * Run Ookla speedtest CLI
  */
@@ -371,10 +393,7 @@ const runOoklaSpeedtest = (
   serverId: number | null
 ): Effect.Effect<ToolResult, SpeedtestError> =>
   Effect.gen(function* () {
-    const cmd = ["speedtest", "--format=json", "--accept-license", "--accept-gdpr"]
-    if (serverId) {
-      cmd.push("--server-id", String(serverId))
-    }
+    const cmd = serverId ? [...OOKLA_CMD, "--server-id", String(serverId)] : OOKLA_CMD
 
     const { stdout, stderr, code } = yield* runCommand(cmd, timeout)
 
@@ -398,33 +417,11 @@ const runOoklaSpeedtest = (
     }
 
     const data = yield* Effect.try({
-      try: () => JSON.parse(stdout) as Record<string, unknown>,
+      try: () => JSON.parse(stdout) as OoklaJson,
       catch: (e) => new SpeedtestError("parse", `JSON parse error: ${e}`),
     })
 
-    const download = data.download as Record<string, number> | undefined
-    const upload = data.upload as Record<string, number> | undefined
-    const ping = data.ping as Record<string, number> | undefined
-    const server = data.server as Record<string, unknown> | undefined
-    const iface = data.interface as Record<string, string> | undefined
-    const result = data.result as Record<string, string> | undefined
-
-    return {
-      status: "success" as const,
-      download_mbps: Math.round(((download?.bandwidth ?? 0) * 8) / 1_000_000 * 100) / 100,
-      upload_mbps: Math.round(((upload?.bandwidth ?? 0) * 8) / 1_000_000 * 100) / 100,
-      ping_ms: Math.round((ping?.latency ?? 0) * 10) / 10,
-      jitter_ms: ping?.jitter ? Math.round(ping.jitter * 10) / 10 : null,
-      server_name: (server?.name as string) ?? null,
-      server_location: (server?.location as string) ?? null,
-      server_host: (server?.host as string) ?? null,
-      server_id: (server?.id as number) ?? null,
-      client_ip: iface?.externalIp ?? null,
-      isp: (data.isp as string) ?? null,
-      tool: "ookla-speedtest",
-      result_url: result?.url ?? null,
-      error_message: null,
-    }
+    return extractOoklaResult(data)
   })
 
 /**
@@ -432,10 +429,7 @@ const runOoklaSpeedtest = (
  */
 const runSpeedtestCli = (timeout: number): Effect.Effect<ToolResult, SpeedtestError> =>
   Effect.gen(function* () {
-    const { stdout, stderr, code } = yield* runCommand(
-      ["speedtest-cli", "--json"],
-      timeout
-    )
+    const { stdout, stderr, code } = yield* runCommand(SPEEDTEST_CLI_CMD, timeout)
 
     if (code !== 0) {
       return {
@@ -491,10 +485,7 @@ const runSpeedtestCli = (timeout: number): Effect.Effect<ToolResult, SpeedtestEr
 const runFastCli = (timeout: number): Effect.Effect<ToolResult, SpeedtestError> =>
   Effect.gen(function* () {
     // Run with --json and --upload flags for full data
-    const { stdout, stderr, code } = yield* runCommand(
-      ["bunx", "fast-cli", "--json", "--upload"],
-      timeout
-    )
+    const { stdout, stderr, code } = yield* runCommand(FAST_CLI_CMD, timeout)
 
     if (code !== 0) {
       return {
@@ -542,6 +533,23 @@ const runFastCli = (timeout: number): Effect.Effect<ToolResult, SpeedtestError>
     }
   })
 
+type ToolRunner = (
+  timeout: number,
+  serverId: number | null
+) => Effect.Effect<ToolResult, SpeedtestError>
+
+/**
+ * Runner per tool name, built once at module load
+ */
+const TOOL_RUNNERS: ReadonlyMap<string, ToolRunner> = new Map<string, ToolRunner>([
+  ["fast-cli", (timeout) => runFastCli(timeout)],
+  ["ookla-speedtest", (timeout, serverId) => runOoklaSpeedtest(timeout, serverId)],
+  ["speedtest-cli", (timeout) => runSpeedtestCli(timeout)],
+  ["cdn-cloudflare", (timeout) => runCdnTest("cloudflare", CDN_TEST_URLS.cloudflare, timeout)],
+  ["cdn-aws", (timeout) => runCdnTest("aws", CDN_TEST_URLS.aws, timeout)],
+  ["cdn-google", (timeout) => runCdnTest("google", CDN_TEST_URLS.google, timeout)],
+])
+
 /**
  * Measure ping latency to a host
  */
@@ -551,8 +559,7 @@ const measurePingLatency = (
   timeout: number = 5
 ): Effect.Effect<number | null> =>
   Effect.gen(function* () {
-    const isWindows = os.platform() === "win32"
-    const cmd = isWindows
+    const cmd = IS_WINDOWS
       ? ["ping", "-n", String(count), "-w", String(timeout * 1000), host]
       : ["ping", "-c", String(count), "-W", String(timeout), host]
 
@@ -562,43 +569,71 @@ const measurePingLatency = (
 
     if (result.code !== 0) return null
 
-    const output = result.stdout.toLowerCase()
-
-    if (isWindows) {
-      // Windows: "Average = 15ms"
-      const lines = output.split("\n")
-      for (const line of lines) {
-        if (line.includes("average")) {
-          const parts = line.split("=")
-          if (parts.length >= 2) {
-            const avgPart = parts[parts.length - 1].trim().replace("ms", "").trim()
-            const parsed = parseFloat(avgPart)
-            if (!isNaN(parsed)) return parsed
-          }
-        }
-      }
-    } else {
-      // Unix: "rtt min/avg/max/mdev = 10.123/15.456/20.789/3.456 ms"
-      const lines = output.split("\n")
-      for (const line of lines) {
-        if (line.includes("avg") || line.includes("rtt")) {
-          if (line.includes("/")) {
-            const parts = line.split("=")
-            if (parts.length >= 2) {
-              const stats = parts[parts.length - 1].trim().split("/")
-              if (stats.length >= 2) {
-                const parsed = parseFloat(stats[1])
-                if (!isNaN(parsed)) return parsed
-              }
-            }
-          }
-        }
-      }
+    const match = (IS_WINDOWS ? WINDOWS_PING_AVG : UNIX_PING_AVG).exec(result.stdout)
+    if (match) {
+      const parsed = parseFloat(match[1])
+      if (!isNaN(parsed)) return parsed
     }
 
     return null
   })
 
+/**
+ * Measure latency as the time to open a TCP connection (one round trip).
+ * Needs no child process or ICMP access. Returns null if the connection
+ * fails or doesn't complete within the timeout.
+ */
+const measureTcpConnectLatency = (
+  host: string = "8.8.8.8",
+  port: number = 443,
+  timeout: number = 2
+): Effect.Effect<number | null> =>
+  Effect.async<number | null>((resume) => {
+    let done = false
+    const start = performance.now()
+    const socket = net.connect({ host, port })
+
+    const finish = (latencyMs: number | null) => {
+      if (done) return
+      done = true
+      clearTimeout(timeoutId)
+      socket.destroy()
+      resume(Effect.succeed(latencyMs))
+    }
+
+    const timeoutId = setTimeout(() => finish(null), timeout * 1000)
+    socket.once("connect", () =>
+      finish(Math.round((performance.now() - start) * 10) / 10)
+    )
+    socket.once("error", () => finish(null))
+
+    return Effect.sync(() => {
+      done = true
+      clearTimeout(timeoutId)
+      socket.destroy()
+    })
+  })
+
+/**
+ * Pre-test latency probe: averaged ICMP ping (what the congestion thresholds
+ * were tuned against), falling back to TCP connect time where ping is
+ * unavailable or ICMP is blocked
+ */
+const measurePreTestLatency = (): Effect.Effect<number | null> =>
+  Effect.flatMap(measurePingLatency(), (latencyMs) =>
+    latencyMs === null ? measureTcpConnectLatency() : Effect.succeed(latencyMs)
+  )
+
+/**
+ * Idle hours as a set, built once per config object
+ */
+const idleHourSet = memoizeByRef(
+  (config: SpeedtestConfig): ReadonlySet<number> => new Set(config.idle_hours)
+)
+
+const isIdleHour = (config: SpeedtestConfig, hour: number): boolean =>
+  idleHourSet(config).has(hour)
+
 /**
  * Infer network context from time and latency measurements
  */
@@ -608,7 +643,7 @@ const inferNetworkContext = (
   config: SpeedtestConfig
 ): NetworkContext => {
   // Time-based: tests during configured idle hours are always baseline
-  if (config.idle_hours.includes(currentHour)) {
+  if (isIdleHour(config, currentHour)) {
     return "baseline"
   }
 
@@ -668,6 +703,11 @@ export interface SpeedtestServiceShape {
    */
   readonly isRunning: () => Effect.Effect<boolean>
 
+  /**
+   * Complete once no speedtest is running (immediately if none is)
+   */
+  readonly awaitIdle: () => Effect.Effect<void>
+
   /**
    * Get the last speedtest result
    */
@@ -693,7 +733,8 @@ export const SpeedtestServiceLive = Layer.effect(
     const signalRepo = yield* SignalRepository
 
     // State
-    const runningRef = yield* Ref.make(false)
+    // SubscriptionRef so callers can wait for a test to finish instead of polling
+    const runningRef = yield* SubscriptionRef.make(false)
     const lastResultRef = yield* Ref.make<SpeedtestResult | null>(null)
     const availableToolsRef = yield* Ref.make<readonly string[]>([])
     const configRef = yield* Ref.make<SpeedtestConfig>(DEFAULT_CONFIG)
@@ -735,30 +776,19 @@ export const SpeedtestServiceLive = Layer.effect(
       timeout: number,
       serverId: number | null
     ): Effect.Effect<ToolResult, SpeedtestError> => {
-      switch (tool) {
-        case "fast-cli":
-          return runFastCli(timeout)
-        case "ookla-speedtest":
-          return runOoklaSpeedtest(timeout, serverId)
-        case "speedtest-cli":
-          return runSpeedtestCli(timeout)
-        case "cdn-cloudflare":
-          return runCdnTest("cloudflare", CDN_TEST_URLS.cloudflare, timeout)
-        case "cdn-aws":
-          return runCdnTest("aws", CDN_TEST_URLS.aws, timeout)
-        case "cdn-google":
-          return runCdnTest("google", CDN_TEST_URLS.google, timeout)
-        default:
-          return Effect.fail(new SpeedtestError("no_tool", `Unknown tool: ${tool}`))
-      }
+      const runner = TOOL_RUNNERS.get(tool)
+      return runner
+        ? runner(timeout, serverId)
+        : Effect.fail(new SpeedtestError("no_tool", `Unknown tool: ${tool}`))
     }
 
     const impl: SpeedtestServiceShape = {
       runSpeedtest: (options = {}) =>
         Effect.gen(function* () {
-          // Check if already running
-          const isRunning = yield* Ref.get(runningRef)
-          if (isRunning) {
+          // Claim the running flag in one step so two concurrent callers
+          // can't both see it clear and start a test
+          const wasRunning = yield* SubscriptionRef.getAndSet(runningRef, true)
+          if (wasRunning) {
             const now = new Date()
             return {
               timestamp: now,
@@ -783,8 +813,6 @@ export const SpeedtestServiceLive = Layer.effect(
             } satisfies SpeedtestResult
           }
 
-          yield* Ref.set(runningRef, true)
-
           const result = yield* Effect.gen(function* () {
             const config = yield* Ref.get(configRef)
             const available = yield* Ref.get(availableToolsRef)
@@ -798,12 +826,12 @@ export const SpeedtestServiceLive = Layer.effect(
               networkContext = options.contextOverride
               yield* Effect.logDebug(`Network context override: ${networkContext}`)
             } else if (options.enableLatencyProbe !== false) {
-              preTestLatency = yield* measurePingLatency()
+              preTestLatency = yield* measurePreTestLatency()
               networkContext = inferNetworkContext(currentHour, preTestLatency, config)
               yield* Effect.logDebug(
                 `Network context detected: ${networkContext} (latency: ${preTestLatency}ms, hour: ${currentHour})`
               )
-            } else if (config.idle_hours.includes(currentHour)) {
+            } else if (isIdleHour(config, currentHour)) {
               networkContext = "baseline"
             }
 
@@ -832,23 +860,12 @@ export const SpeedtestServiceLive = Layer.effect(
             )
 
             const now = new Date()
+            // ToolResult's fields are a subset of SpeedtestResult, so they
+            // carry over as-is and only the run metadata is added
             const speedtestResult: SpeedtestResult = {
+              ...toolResult,
               timestamp: now,
               timestamp_unix: now.getTime() / 1000,
-              download_mbps: toolResult.download_mbps,
-              upload_mbps: toolResult.upload_mbps,
-              ping_ms: toolResult.ping_ms,
-              jitter_ms: toolResult.jitter_ms,
-              server_name: toolResult.server_name,
-              server_location: toolResult.server_location,
-              server_host: toolResult.server_host,
-              server_id: toolResult.server_id,
-              client_ip: toolResult.client_ip,
-              isp: toolResult.isp,
-              tool: toolResult.tool,
-              result_url: toolResult.result_url,
-              status: toolResult.status,
-              error_message: toolResult.error_message,
               triggered_by: options.triggeredBy ?? "manual",
               network_context: networkContext,
               pre_test_latency_ms: preTestLatency,
@@ -858,7 +875,7 @@ export const SpeedtestServiceLive = Layer.effect(
             // Note: Convert null to undefined for Effect Schema optionalWith fields
             const dbRecord: SpeedtestResultInsert = {
               timestamp: now.toISOString(),
-              timestamp_unix: now.getTime() / 1000,
+              timestamp_unix: speedtestResult.timestamp_unix,
               download_mbps: speedtestResult.download_mbps,
               upload_mbps: speedtestResult.upload_mbps,
               ping_ms: speedtestResult.ping_ms,
@@ -892,7 +909,7 @@ export const SpeedtestServiceLive = Layer.effect(
 
             return speedtestResult
           }).pipe(
-            Effect.ensuring(Ref.set(runningRef, false))
+            Effect.ensuring(SubscriptionRef.set(runningRef, false))
           )
 
           return result
@@ -916,7 +933,14 @@ export const SpeedtestServiceLive = Layer.effect(
           }
         }),
 
-      isRunning: () => Ref.get(runningRef),
+      isRunning: () => SubscriptionRef.get(runningRef),
+
+      awaitIdle: () =>
+        runningRef.changes.pipe(
+          Stream.filter((running) => !running),
+          Stream.take(1),
+          Stream.runDrain
+        ),
 
       getLastResult: () => Ref.get(lastResultRef),
     }